@@ -2,25 +2,84 @@
 Data Backup Manager Module
 Handles periodic backups and recovery
 """
+import bisect
+import filecmp
 import json
 import os
+import queue
 import re
 import shutil
+import threading
+import time
 from datetime import datetime
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+BACKUP_PREFIX = 'battery_test_data_backup_'
+BACKUP_SUFFIX = '.json'
+_TS_FMT = '%Y%m%d_%H%M%S'
+# One pass per directory entry: prefix/suffix filter plus timestamp capture
+_BACKUP_NAME_RE = re.compile(
+    re.escape(BACKUP_PREFIX) + r'(\d{8}_\d{6})?.*' + re.escape(BACKUP_SUFFIX) + r'\Z', re.DOTALL
+)
+
+
+def _loads(buf):
+    """Parse JSON bytes, using orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(buf)
+    return json.loads(buf)
+
+
+def _fast_copy(src, dst):
+    """
+    Copy a file and its metadata like shutil.copy2, letting the kernel move
+    the bytes. Uses os.copy_file_range where available (Linux, may reflink);
+    shutil.copyfile already uses sendfile/fast paths on the other platforms.
+    """
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            # Unsupported filesystem / cross-device copy: use the generic path
+            pass
+    shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
+
 
 class BackupManager:
     """Manage data file backups and recovery"""
     
-    def __init__(self, data_file='battery_test_data.json', backup_dir='backups', keep_backups=5):
+    def __init__(self, data_file='battery_test_data.json', backup_dir='backups', keep_backups=5, durable=False):
         self.data_file = data_file
         self.backup_dir = backup_dir
         self.keep_backups = keep_backups
-        self.last_backup_time = None
+        self.durable = durable  # fsync each backup before it becomes visible
+        self._backup_path_prefix = os.path.join(backup_dir, BACKUP_PREFIX)
+        self.last_backup_monotonic = None
+        # Sorted (timestamp, path, size, mtime) tuples, oldest first; None until scanned
+        self._backup_cache = None
+        # path -> (mtime_ns, size, is_valid) from earlier validate_json runs
+        self._validation_cache = {}
+        # Held while the data file is copied; writers of data_file take it too
+        self.file_lock = threading.Lock()
+        self._queue = None
+        self._worker = None
         
         # Create backup directory if it doesn't exist
-        if not os.path.exists(self.backup_dir):
-            os.makedirs(self.backup_dir)
+        os.makedirs(self.backup_dir, exist_ok=True)
     
     def create_backup(self):
         """Create a timestamped backup of the data file"""
@@ -28,12 +87,31 @@ class BackupManager:
             return None
         
         try:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_filename = f"battery_test_data_backup_{timestamp}.json"
-            backup_path = os.path.join(self.backup_dir, backup_filename)
+            timestamp = time.strftime(_TS_FMT)
+            backup_path = self._backup_path_prefix + timestamp + BACKUP_SUFFIX
+            
+            # Copy to a temp name and rename into place, so a crash mid-copy
+            # never leaves a truncated backup for recovery to trip over
+            tmp_path = backup_path + '.tmp'
+            try:
+                with self.file_lock:
+                    _fast_copy(self.data_file, tmp_path)
+                if self.durable:
+                    with open(tmp_path, 'r+b') as f:
+                        os.fsync(f.fileno())
+                os.replace(tmp_path, backup_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self.last_backup_monotonic = time.monotonic()
             
-            shutil.copy2(self.data_file, backup_path)
-            self.last_backup_time = datetime.now()
+            if self._backup_cache is not None:
+                st = os.stat(backup_path)
+                record = (timestamp, backup_path, st.st_size, st.st_mtime)
+                # A backup within the same second overwrites the previous file
+                self._backup_cache = [b for b in self._backup_cache if b[1] != backup_path]
+                bisect.insort(self._backup_cache, record)
             
             # Clean up old backups
             self._cleanup_old_backups()
@@ -43,45 +121,144 @@ class BackupManager:
             print(f"Warning: Could not create backup: {e}")
             return None
     
+    def _iter_backup_entries(self):
+        """Yield (os.DirEntry, filename timestamp) for backup files in the backup directory"""
+        match = _BACKUP_NAME_RE.match
+        with os.scandir(self.backup_dir) as it:
+            for entry in it:
+                m = match(entry.name)
+                if m:
+                    yield entry, m.group(1) or ''
+
+    def _scan_backups(self):
+        """Return (timestamp, path, size, mtime) tuples for all backups, oldest first"""
+        backups = []
+        for entry, ts in self._iter_backup_entries():
+            # Timestamp from the filename gives a reliable sort
+            st = entry.stat()
+            backups.append((ts, entry.path, st.st_size, st.st_mtime))
+
+        backups.sort()
+        return backups
+
+    def _get_backups(self):
+        """Return the cached backup list, scanning the directory on first use"""
+        if self._backup_cache is None:
+            self._backup_cache = self._scan_backups()
+        return self._backup_cache
+
+    def _invalidate_backup_cache(self):
+        """Force the next lookup to re-scan the backup directory"""
+        self._backup_cache = None
+
     def _cleanup_old_backups(self):
         """Remove old backups, keeping only the most recent N"""
         try:
-            backups = []
-            for filename in os.listdir(self.backup_dir):
-                if filename.startswith('battery_test_data_backup_') and filename.endswith('.json'):
-                    filepath = os.path.join(self.backup_dir, filename)
-                    # Extract timestamp from filename for reliable sort
-                    ts_match = re.search(r'(\d{8}_\d{6})', filename)
-                    ts = ts_match.group(1) if ts_match else ''
-                    backups.append((ts, filepath))
-
-            # Sort by timestamp in filename (newest first)
-            backups.sort(key=lambda x: x[0], reverse=True)
+            backups = self._get_backups()
+            excess = len(backups) - self.keep_backups
+            if excess <= 0:
+                return
+            
+            # The cache is kept sorted, so the oldest backups are simply the head
+            expired = backups[:excess]
+            del backups[:excess]
             
             # Remove old backups
-            for _, filepath in backups[self.keep_backups:]:
+            for _, filepath, _, _ in expired:
+                self._validation_cache.pop(filepath, None)
                 try:
                     os.remove(filepath)
+                except FileNotFoundError:
+                    # Directory changed behind our back; re-scan next time
+                    self._invalidate_backup_cache()
                 except Exception as e:
                     print(f"Warning: Could not remove old backup {filepath}: {e}")
         except Exception as e:
             print(f"Warning: Could not cleanup backups: {e}")
     
+    def start_worker(self):
+        """Start a background thread that runs scheduled backups"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._queue = queue.SimpleQueue()
+        self._worker = threading.Thread(target=self._worker_loop, name='backup-worker', daemon=True)
+        self._worker.start()
+    
+    def stop_worker(self, timeout=10):
+        """Finish any queued backup and stop the background thread"""
+        if self._worker is None:
+            return
+        self._queue.put(None)
+        self._worker.join(timeout)
+        self._worker = None
+        self._queue = None
+    
+    def submit(self, func, *args):
+        """Run func(*args) on the worker thread (inline if no worker is running)"""
+        if self._worker is None:
+            func(*args)
+            return
+        self._queue.put((func, args))
+    
+    def schedule_backup(self):
+        """Queue a backup on the worker thread, or run it inline if no worker is running"""
+        if self._worker is None:
+            self.create_backup()
+            return
+        # Count the interval from now so should_backup doesn't re-fire while queued
+        self.last_backup_monotonic = time.monotonic()
+        self._queue.put(True)
+    
+    def _worker_loop(self):
+        """Worker thread: run submitted jobs, coalescing each burst of backup requests into one"""
+        while True:
+            requests = [self._queue.get()]
+            while True:
+                try:
+                    requests.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for request in requests:
+                if isinstance(request, tuple):
+                    func, args = request
+                    try:
+                        func(*args)
+                    except Exception as e:
+                        print(f"Warning: Background task failed: {e}")
+            if True in requests:
+                self.create_backup()
+            if None in requests:
+                return
+    
     def should_backup(self, interval_minutes=5):
         """Check if it's time to create a backup"""
-        if self.last_backup_time is None:
+        if self.last_backup_monotonic is None:
             return True
         
-        elapsed = (datetime.now() - self.last_backup_time).total_seconds()
-        return elapsed >= (interval_minutes * 60)
+        return time.monotonic() - self.last_backup_monotonic >= interval_minutes * 60
     
     def validate_json(self, filepath):
         """Validate JSON file structure"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(filepath, 'rb') as f:
+                buf = f.read()
+        except Exception as e:
+            return False, f"Error reading file: {e}"
+        return self._validate_buffer(buf)
+    
+    def _validate_buffer(self, buf):
+        """Validate raw JSON bytes; returns (is_valid, data_or_error)"""
+        try:
+            # Cheap byte scan first: a file missing either key can't be valid,
+            # so skip the full parse for it
+            if b'"data_version"' not in buf:
+                return False, "Missing data_version field"
+            if b'"laptops"' not in buf:
+                return False, "Missing laptops field"
             
-            # Check required fields
+            data = _loads(buf)
+            
+            # Check required fields (top level only)
             if 'data_version' not in data:
                 return False, "Missing data_version field"
             if 'laptops' not in data:
@@ -93,49 +270,97 @@ class BackupManager:
         except Exception as e:
             return False, f"Error reading file: {e}"
     
+    def _check_backup(self, filepath):
+        """
+        Validate a backup, reusing the cached verdict if the file is unchanged
+        Returns (is_valid, data): data is the parsed backup, or None when the
+        verdict came from the cache
+        """
+        try:
+            # One open serves both the cache key (fstat) and the read
+            with open(filepath, 'rb') as f:
+                st = os.fstat(f.fileno())
+                key = (st.st_mtime_ns, st.st_size)
+                cached = self._validation_cache.get(filepath)
+                if cached is not None and cached[:2] == key:
+                    return cached[2], None
+                buf = f.read()
+        except OSError:
+            # Removed behind our back; re-scan the directory next time
+            self._validation_cache.pop(filepath, None)
+            self._invalidate_backup_cache()
+            return False, None
+        
+        is_valid, result = self._validate_buffer(buf)
+        self._validation_cache[filepath] = key + (is_valid,)
+        return is_valid, (result if is_valid else None)
+    
     def recover_from_backup(self):
         """Attempt to recover data from most recent backup"""
+        success, message, _ = self._recover()
+        return success, message
+    
+    def parse_or_recover(self):
+        """
+        Parse the data file, restoring the newest valid backup if it is corrupted
+        Returns the data dict, or None if neither could be read
+        """
+        is_valid, result = self.validate_json(self.data_file)
+        if is_valid:
+            return result
+        
+        print(f"Warning: Data file is corrupted: {result}")
+        print("Attempting recovery from backup...")
+        success, message, data = self._recover()
+        if not success:
+            print(f"Recovery failed: {message}")
+            return None
+        print(f"✓ {message}")
+        if data is None:
+            # Backup verdict came from the cache: parse the restored file
+            is_valid, data = self.validate_json(self.data_file)
+            if not is_valid:
+                return None
+        return data
+    
+    def _recover(self):
+        """recover_from_backup, also returning the restored data when it was parsed"""
         try:
-            backups = []
-            for filename in os.listdir(self.backup_dir):
-                if filename.startswith('battery_test_data_backup_') and filename.endswith('.json'):
-                    filepath = os.path.join(self.backup_dir, filename)
-                    ts_match = re.search(r'(\d{8}_\d{6})', filename)
-                    ts = ts_match.group(1) if ts_match else ''
-                    backups.append((ts, filepath))
-
+            backups = self._get_backups()
             if not backups:
-                return False, "No backups found"
-
-            backups.sort(key=lambda x: x[0], reverse=True)
+                # Backups may have been copied in by hand since the last scan
+                self._invalidate_backup_cache()
+                backups = self._get_backups()
+            if not backups:
+                return False, "No backups found", None
             
-            # Try each backup until we find a valid one
-            for _, backup_path in backups:
-                is_valid, result = self.validate_json(backup_path)
+            # Try each backup until we find a valid one (newest first)
+            for _, backup_path, _, _ in reversed(backups):
+                is_valid, data = self._check_backup(backup_path)
                 if is_valid:
+                    # Nothing to write if the data file already holds these bytes
+                    if os.path.exists(self.data_file) and filecmp.cmp(backup_path, self.data_file, shallow=False):
+                        return True, f"Data file already matches {os.path.basename(backup_path)}", data
                     # Restore the backup
-                    shutil.copy2(backup_path, self.data_file)
-                    return True, f"Recovered from {os.path.basename(backup_path)}"
+                    _fast_copy(backup_path, self.data_file)
+                    return True, f"Recovered from {os.path.basename(backup_path)}", data
             
-            return False, "No valid backups found"
+            return False, "No valid backups found", None
         except Exception as e:
-            return False, f"Recovery error: {e}"
+            self._invalidate_backup_cache()
+            return False, f"Recovery error: {e}", None
     
     def get_backup_list(self):
         """Get list of available backups"""
         backups = []
         try:
-            for filename in os.listdir(self.backup_dir):
-                if filename.startswith('battery_test_data_backup_') and filename.endswith('.json'):
-                    filepath = os.path.join(self.backup_dir, filename)
-                    backups.append({
-                        'filename': filename,
-                        'path': filepath,
-                        'size': os.path.getsize(filepath),
-                        'modified': datetime.fromtimestamp(os.path.getmtime(filepath)).isoformat(),
-                    })
-            
-            backups.sort(key=lambda x: x['modified'], reverse=True)
+            for ts, path, size, mtime in reversed(self._get_backups()):
+                backups.append({
+                    'filename': os.path.basename(path),
+                    'path': path,
+                    'size': size,
+                    'modified': datetime.fromtimestamp(mtime).isoformat(),
+                })
         except Exception as e:
             print(f"Warning: Could not list backups: {e}")
         
@@ -3,59 +3,67 @@ Battery Health Monitor Module
 Retrieves battery health metrics via WMI
 """
 import platform
+from wmi_connection import WMI_AVAILABLE, get_wmi, reset_wmi
 
-try:
-    import wmi
-    WMI_AVAILABLE = True
-except ImportError:
-    WMI_AVAILABLE = False
+BATTERY_HEALTH_WQL = "SELECT DesignCapacity, FullChargeCapacity FROM Win32_Battery"
 
 
-def get_battery_health():
+def _build_health_info(design_capacity, full_charge_capacity, cycles=None):
+    """Build the health dict from raw capacity values"""
+    health_info = {
+        'design_capacity_mwh': None,
+        'full_charge_capacity_mwh': None,
+        'health_percent': None,
+        'cycles': None,
+    }
+    
+    # Design Capacity (mWh)
+    if design_capacity:
+        health_info['design_capacity_mwh'] = design_capacity
+    
+    # Full Charge Capacity (mWh)
+    if full_charge_capacity:
+        health_info['full_charge_capacity_mwh'] = full_charge_capacity
+    
+    # Calculate Health Percentage
+    if health_info['design_capacity_mwh'] and health_info['full_charge_capacity_mwh']:
+        health_info['health_percent'] = round(
+            (health_info['full_charge_capacity_mwh'] / health_info['design_capacity_mwh']) * 100, 2
+        )
+    
+    # Cycle Count (may not be available)
+    if cycles is not None:
+        health_info['cycles'] = cycles
+    
+    return health_info
+
+
+def get_battery_health(status=None):
     """
     Retrieve battery health metrics via WMI (Win32_Battery)
+    status: optional dict from BatteryMonitor.get_battery_status(); its capacity
+            fields come from the same Win32_Battery row, so passing it avoids a
+            second WMI round-trip
     Returns dict with battery health info or None if unavailable
     """
     if not WMI_AVAILABLE or platform.system() != 'Windows':
         return None
     
+    if status is not None:
+        return _build_health_info(status.get('design_capacity_mwh'), status.get('full_charge_capacity_mwh'))
+    
     try:
-        c = wmi.WMI()
-        batteries = c.Win32_Battery()
+        batteries = get_wmi().query(BATTERY_HEALTH_WQL)
         
         if not batteries:
             return None
         
         battery = batteries[0]
-        
-        health_info = {
-            'design_capacity_mwh': None,
-            'full_charge_capacity_mwh': None,
-            'health_percent': None,
-            'cycles': None,
-        }
-        
-        # Design Capacity (mWh)
-        if battery.DesignCapacity:
-            health_info['design_capacity_mwh'] = battery.DesignCapacity
-        
-        # Full Charge Capacity (mWh)
-        if battery.FullChargeCapacity:
-            health_info['full_charge_capacity_mwh'] = battery.FullChargeCapacity
-        
-        # Calculate Health Percentage
-        if health_info['design_capacity_mwh'] and health_info['full_charge_capacity_mwh']:
-            health_info['health_percent'] = round(
-                (health_info['full_charge_capacity_mwh'] / health_info['design_capacity_mwh']) * 100, 2
-            )
-        
-        # Cycle Count (may not be available)
-        if hasattr(battery, 'CycleCount') and battery.CycleCount is not None:
-            health_info['cycles'] = battery.CycleCount
-        
-        return health_info
+        cycles = battery.CycleCount if hasattr(battery, 'CycleCount') else None
+        return _build_health_info(battery.DesignCapacity, battery.FullChargeCapacity, cycles)
         
     except Exception as e:
+        reset_wmi()
         print(f"Warning: Could not retrieve battery health: {e}")
         return None
 
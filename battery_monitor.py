@@ -5,25 +5,34 @@ Monitors battery status, percentage, and charging state
 import time
 import platform
 import psutil
+from wmi_connection import WMI_AVAILABLE, get_wmi, reset_wmi
 
-try:
-    import wmi
-    WMI_AVAILABLE = True
-except ImportError:
-    WMI_AVAILABLE = False
+# Only fetch the properties we read; a bare Win32_Battery() marshals every column
+BATTERY_STATUS_WQL = (
+    "SELECT EstimatedChargeRemaining, BatteryStatus, DesignCapacity, FullChargeCapacity "
+    "FROM Win32_Battery"
+)
 
 
 class BatteryMonitor:
     """Monitor battery status and detect power source changes"""
     
     def __init__(self):
-        self.last_percentage = None
+        self.last_pct_bucket = None  # last percentage // 10, for 10% drop detection
         self.last_charging_state = None
+        self._event_buf = {}  # reused monitor_battery callback payload
         self.poll_interval = 10  # seconds
+        self.min_poll_interval = 2  # seconds, adaptive polling lower bound
+        self.max_poll_interval = 60  # seconds, adaptive polling upper bound
+        self.capacity_ttl = 60  # seconds before capacity values are re-read from WMI
+        self._capacity_cache = None  # (design_mwh, full_charge_mwh, monotonic time)
         
-    def get_battery_status(self):
+    def get_battery_status(self, need_capacity=False):
         """
         Get current battery status
+        need_capacity: refresh design/full charge capacity from WMI if the cached
+                       values are older than capacity_ttl; otherwise WMI is only
+                       queried when psutil can't read the battery
         Returns dict with: percentage, charging, ac_connected, design_capacity, full_charge_capacity
         """
         status = {
@@ -44,11 +53,16 @@ class BatteryMonitor:
         except Exception as e:
             print(f"Warning: Could not get battery status from psutil: {e}")
         
+        cache = self._capacity_cache
+        cache_fresh = cache is not None and time.monotonic() - cache[2] < self.capacity_ttl
+        need_wmi = status['percentage'] is None or (need_capacity and not cache_fresh)
+        if cache is not None:
+            status['design_capacity_mwh'], status['full_charge_capacity_mwh'] = cache[0], cache[1]
+        
         # Use WMI for detailed battery info (Windows)
-        if WMI_AVAILABLE and platform.system() == 'Windows':
+        if need_wmi and WMI_AVAILABLE and platform.system() == 'Windows':
             try:
-                c = wmi.WMI()
-                batteries = c.Win32_Battery()
+                batteries = get_wmi().query(BATTERY_STATUS_WQL)
                 
                 if batteries:
                     battery = batteries[0]
@@ -72,75 +86,152 @@ class BatteryMonitor:
                         status['ac_connected'] = True
                     
                     # Get capacity info
+                    status['design_capacity_mwh'] = None
+                    status['full_charge_capacity_mwh'] = None
                     if battery.DesignCapacity:
                         status['design_capacity_mwh'] = battery.DesignCapacity
                     if battery.FullChargeCapacity:
                         status['full_charge_capacity_mwh'] = battery.FullChargeCapacity
+                    self._capacity_cache = (
+                        status['design_capacity_mwh'], status['full_charge_capacity_mwh'], time.monotonic()
+                    )
                         
             except Exception as e:
+                reset_wmi()
                 print(f"Warning: Could not get battery status from WMI: {e}")
         
         return status
     
-    def is_on_battery(self):
-        """Check if laptop is running on battery (AC disconnected)"""
-        status = self.get_battery_status()
+    def connect(self):
+        """
+        Open the WMI connection up front (on the calling thread) so the first
+        status poll doesn't pay for COM setup. Returns False if WMI is unavailable
+        """
+        try:
+            return get_wmi() is not None
+        except Exception as e:
+            print(f"Warning: Could not connect to WMI: {e}")
+            return False
+    
+    def close(self):
+        """Release the calling thread's cached WMI connection"""
+        reset_wmi()
+    
+    def is_on_battery(self, status=None):
+        """
+        Check if laptop is running on battery (AC disconnected)
+        status: optional dict from get_battery_status() to check instead of querying
+        """
+        if status is None:
+            status = self.get_battery_status()
         return not status['ac_connected'] and not status['charging']
     
-    def wait_for_battery_power(self):
+    def wait_for_battery_power(self, wake_event=None):
         """
         Wait until laptop switches to battery power
+        wake_event: optional threading.Event set on power-change notifications
+                    (see power_event_logger.PowerChangeWatcher); the wait then
+                    sleeps until notified, with polling only as a slow fallback
         Returns True when on battery, False if interrupted
         """
         print("Waiting for AC power to be disconnected...")
         print("Please unplug the charger.")
         
+        # Poll quickly right after the prompt (the user is about to unplug),
+        # then back off while nothing changes; notifications let it back off further
+        max_interval = self.max_poll_interval if wake_event is not None else self.poll_interval
+        interval = self.min_poll_interval
+        last_ac = None
         while True:
-            if self.is_on_battery():
+            # One query per pass serves both the check and the progress line
+            status = self.get_battery_status()
+            if self.is_on_battery(status):
                 print("✓ Running on battery power")
                 return True
             
-            status = self.get_battery_status()
             if status['percentage']:
                 print(f"Battery: {status['percentage']:.1f}% | AC Connected: {status['ac_connected']}", end='\r')
             
-            time.sleep(self.poll_interval)
+            if status['ac_connected'] != last_ac:
+                interval = self.min_poll_interval
+            else:
+                interval = min(interval * 2, max_interval)
+            last_ac = status['ac_connected']
+            
+            if wake_event is not None:
+                wake_event.wait(interval)
+                wake_event.clear()
+            else:
+                time.sleep(interval)
+    
+    def _adaptive_interval(self, prev_percent, prev_time, percent, now, on_ac):
+        """
+        Pick the next poll interval from the observed discharge rate
+        Sleeps about half the time a 10% step takes, so no 10% crossing is missed
+        """
+        if on_ac:
+            return self.max_poll_interval
+        if prev_percent is None or percent is None or now <= prev_time:
+            return self.poll_interval
+        
+        pct_per_sec = abs(prev_percent - percent) / (now - prev_time)
+        if pct_per_sec == 0:
+            return self.max_poll_interval
+        return max(self.min_poll_interval, min(self.max_poll_interval, 0.5 * 10.0 / pct_per_sec))
     
     def monitor_battery(self, callback=None, stop_event=None):
         """
         Continuously monitor battery status
-        callback: function(status_dict) called on each poll
+        callback: function(status_dict) called once per poll; the 'event' key is
+                  'charging_detected' or 'percentage_drop' when that transition
+                  happened on this poll, otherwise 'status_update'.
+                  The dict is reused between polls: copy it to keep it.
         stop_event: threading.Event to stop monitoring
         """
+        prev_percent = None
+        prev_time = 0.0
         while True:
             if stop_event and stop_event.is_set():
                 break
             
             status = self.get_battery_status()
+            now = time.monotonic()
+            event_type = 'status_update'
             
             # Check for charging during test
             if status['ac_connected'] or status['charging']:
                 if self.last_charging_state == False:  # Was on battery, now charging
-                    if callback:
-                        callback({'event': 'charging_detected', **status})
+                    event_type = 'charging_detected'
             
             # Check for percentage drops (10% increments)
-            if self.last_percentage is not None and status['percentage'] is not None:
-                current_10pct = int(status['percentage'] / 10)
-                last_10pct = int(self.last_percentage / 10)
-                
-                if current_10pct < last_10pct:
-                    if callback:
-                        callback({'event': 'percentage_drop', **status})
+            if status['percentage'] is not None:
+                bucket = int(status['percentage'] // 10)
+                if self.last_pct_bucket is not None and bucket < self.last_pct_bucket:
+                    if event_type == 'status_update':
+                        event_type = 'percentage_drop'
+                self.last_pct_bucket = bucket
             
             # Update last known state
-            self.last_percentage = status['percentage']
             self.last_charging_state = status['charging']
             
             if callback:
-                callback({'event': 'status_update', **status})
+                event = self._event_buf
+                event.clear()
+                event.update(status)
+                event['event'] = event_type
+                callback(event)
+            
+            on_ac = status['ac_connected'] or status['charging']
+            interval = self._adaptive_interval(prev_percent, prev_time, status['percentage'], now, on_ac)
+            # Only re-measure the rate once the percentage actually moves
+            if prev_percent is None or status['percentage'] != prev_percent:
+                prev_percent = status['percentage']
+                prev_time = now
             
-            time.sleep(self.poll_interval)
+            if stop_event:
+                stop_event.wait(interval)
+            else:
+                time.sleep(interval)
 
 
 if __name__ == '__main__':
@@ -2,166 +2,456 @@
 Main Battery Tester Script
 Entry point for battery testing application
 """
-import argparse
+import atexit
+import functools
 import logging
+import logging.handlers
 import os
+import queue
 import signal
 import sys
+import threading
 import time
 import traceback
+import weakref
 from datetime import datetime
-from hardware_info import get_hardware_info, get_battery_info, generate_laptop_id
-from battery_monitor import BatteryMonitor
-from battery_health import get_battery_health
-from data_logger import DataLogger
-from test_validator import TestValidator
-from test_resumer import TestResumer
-from power_manager import PowerManager
-from charging_monitor import ChargingMonitor
-from low_battery_handler import LowBatteryHandler
-from metadata_logger import collect_test_metadata
-from results_viewer import ResultsViewer
-from report_generator import ReportGenerator
-from discharge_analyzer import DischargeAnalyzer
-from power_event_logger import PowerEventLogger
+from data_logger import DataLogger, config_hash, now_iso
 from test_config import TestConfig, PRESETS
+# Hardware, WMI and test-loop modules are imported where they are used, so
+# information commands (--list, --compare, --help...) start without them
 
 # Global debug logger
 debug_logger = None
+debug_log_file = None      # absolute path of the current debug log
+debug_log_name = None      # its file name, for the menu header
+debug_log_listener = None
 DEBUG_MODE = False
+VERSION_STRING = 'Battery Tester 1.0.0'
+
+
+_LOG_LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+    'critical': logging.CRITICAL,
+}
+
+
+class _BufferedFileHandler(logging.FileHandler):
+    """
+    FileHandler writing through a 64 KiB buffer. Records are not flushed one
+    by one; sync() (called once per MemoryHandler batch) and close() write the
+    buffer out.
+    """
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, encoding=self.encoding,
+                    errors=self.errors, buffering=65536)
+
+    def flush(self):
+        # StreamHandler.emit flushes after every record; defer that to sync()
+        pass
+
+    def sync(self):
+        """Write buffered records to the file"""
+        with self.lock:
+            if self.stream is not None:
+                self.stream.flush()
+
+
+class _BatchMemoryHandler(logging.handlers.MemoryHandler):
+    """MemoryHandler that syncs its buffered file target once per batch"""
+
+    def flush(self):
+        super().flush()
+        with self.lock:
+            if isinstance(self.target, _BufferedFileHandler):
+                self.target.sync()
 
 
 def setup_debug_logging():
     """Setup debug logging to file"""
-    global debug_logger, DEBUG_MODE
+    global debug_logger, debug_log_file, debug_log_name, debug_log_listener, DEBUG_MODE
     
     DEBUG_MODE = True
     
     # Create logs directory if it doesn't exist
     log_dir = 'logs'
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
+    os.makedirs(log_dir, exist_ok=True)
     
     # Create log filename with timestamp
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    log_file = os.path.join(log_dir, f'battery_tester_debug_{timestamp}.log')
+    # Resolved once here; the menu and debug on/off screens reuse these strings
+    log_file = os.path.abspath(os.path.join(log_dir, f'battery_tester_debug_{timestamp}.log'))
+    
+    # Configure logging. File records are buffered in memory and written in
+    # batches of 64 (one buffered write + flush per batch), or straight away
+    # from a warning up, so debug logging doesn't cost a file write per call
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+    file_handler = _BufferedFileHandler(log_file, encoding='utf-8', delay=True)
+    file_handler.setFormatter(formatter)
+    memory_handler = _BatchMemoryHandler(64, flushLevel=logging.WARNING, target=file_handler)
+    stream_handler = logging.StreamHandler()  # Also print to console
+    stream_handler.setFormatter(formatter)
     
-    # Configure logging
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s [%(levelname)s] %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S',
-        handlers=[
-            logging.FileHandler(log_file, encoding='utf-8'),
-            logging.StreamHandler()  # Also print to console
-        ]
+    # log_debug only enqueues the record; a listener thread does the file and
+    # console writes, keeping them off the test loop
+    log_queue = queue.Queue(-1)
+    debug_log_listener = logging.handlers.QueueListener(
+        log_queue, memory_handler, stream_handler, respect_handler_level=True
     )
+    debug_log_listener.start()
     
     debug_logger = logging.getLogger('battery_tester')
+    debug_logger.setLevel(logging.DEBUG)
+    debug_logger.propagate = False
+    debug_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    debug_log_file = log_file
+    debug_log_name = os.path.basename(log_file)
     debug_logger.info("=" * 70)
     debug_logger.info("DEBUG MODE ENABLED")
     debug_logger.info("=" * 70)
-    debug_logger.info(f"Log file: {os.path.abspath(log_file)}")
+    debug_logger.info(f"Log file: {log_file}")
     debug_logger.info(f"Python version: {sys.version}")
     debug_logger.info(f"Platform: {sys.platform}")
     debug_logger.info(f"Command line arguments: {sys.argv}")
     debug_logger.info("=" * 70)
     
-    print(f"\n[DEBUG] Logging enabled. Log file: {os.path.abspath(log_file)}\n")
+    print(f"\n[DEBUG] Logging enabled. Log file: {log_file}\n")
     
     return debug_logger
 
 
-def log_debug(message, level='info'):
-    """Log a debug message if debug mode is enabled"""
-    global debug_logger, DEBUG_MODE
+def shutdown_debug_logging():
+    """Flush queued/buffered debug records and detach the debug log handlers"""
+    global debug_logger, debug_log_file, debug_log_name, debug_log_listener, DEBUG_MODE
+    
+    if debug_logger:
+        for handler in debug_logger.handlers[:]:
+            debug_logger.removeHandler(handler)
+            handler.close()
     
-    if DEBUG_MODE and debug_logger:
-        if level == 'debug':
-            debug_logger.debug(message)
-        elif level == 'info':
-            debug_logger.info(message)
-        elif level == 'warning':
-            debug_logger.warning(message)
-        elif level == 'error':
-            debug_logger.error(message)
-        elif level == 'critical':
-            debug_logger.critical(message)
-        elif level == 'exception':
-            debug_logger.exception(message)
+    if debug_log_listener:
+        # Writes out everything still queued, then stops the thread
+        debug_log_listener.stop()
+        for handler in debug_log_listener.handlers:
+            target = getattr(handler, 'target', None)
+            handler.close()  # MemoryHandler flushes to its target here
+            if target is not None:
+                target.close()
+    
+    debug_logger = None
+    debug_log_file = None
+    debug_log_name = None
+    debug_log_listener = None
+    DEBUG_MODE = False
+
+
+def log_debug(fmt, *args, level='info'):
+    """
+    Log a debug message if debug mode is enabled.
+    fmt is %-style and formatted with args only if the record is emitted.
+    """
+    if not (DEBUG_MODE and debug_logger):
+        return
+    if level == 'exception':
+        debug_logger.exception(fmt, *args)
+    else:
+        debug_logger.log(_LOG_LEVELS.get(level, logging.INFO), fmt, *args)
+
+
+# Live BatteryTester instances; the process-wide signal handler forwards to each
+_signal_targets = weakref.WeakSet()
+_signals_installed = False
+
+
+def _dispatch_signal(signum, frame):
+    """Forward a signal to every live BatteryTester"""
+    for tester in list(_signal_targets):
+        tester._signal_handler(signum, frame)
+
+
+def _parse_poll_target_delta(value, default=0.1):
+    """poll_target_delta as a positive float; config edits may store it as a string"""
+    try:
+        delta = float(value)
+        if delta <= 0:
+            raise ValueError(value)
+        return delta
+    except (TypeError, ValueError):
+        print(f"Warning: Invalid poll_target_delta {value!r}, using {default}")
+        return default
+
+
+def _flush_at_exit():
+    """atexit hook: last chance for every live BatteryTester to persist buffered data"""
+    for tester in list(_signal_targets):
+        tester._emergency_flush()
+
+
+def _install_signals():
+    """
+    Install the process signal handlers and the exit flush once
+    (SIGINT, plus SIGTERM/SIGBREAK on Windows)
+    """
+    global _signals_installed
+    if _signals_installed:
+        return
+    signal.signal(signal.SIGINT, _dispatch_signal)
+    if sys.platform == 'win32':
+        signal.signal(signal.SIGTERM, _dispatch_signal)
+        # Ctrl+Break / CTRL_BREAK_EVENT would otherwise kill the process outright
+        signal.signal(signal.SIGBREAK, _dispatch_signal)
+    # Registered once, like the handlers, so no tester is kept alive by it
+    atexit.register(_flush_at_exit)
+    _signals_installed = True
+
+
+CLI_EPILOG = '''
+Examples:
+  battery_tester.exe                    # Start new test (interactive)
+  battery_tester.exe --list             # Show all laptops summary
+  battery_tester.exe --compare          # Compare all laptops sorted by runtime
+  battery_tester.exe --current          # Show current laptop results
+  battery_tester.exe --report           # Generate report for current laptop
+  battery_tester.exe --report LAPTOP-123 # Generate report for specific laptop
+  battery_tester.exe --resume           # Resume interrupted test
+  battery_tester.exe --validate         # Run pre-test checks only
+  battery_tester.exe --notes "Test after battery replacement"
+  battery_tester.exe --history LAPTOP-123 # Show test history
+  battery_tester.exe --auto-open        # Auto-open report after generation
+  battery_tester.exe --low-battery 15   # Set low battery threshold to 15%%
+  battery_tester.exe --backup-interval 10 # Backup every 10 minutes
+            '''
+
+
+# Flags that, given on their own, map directly to a handler called with its
+# defaults (same result as the argparse path)
+_SIMPLE_COMMANDS = {
+    '--list': 'handle_list_command',
+    '--compare': 'handle_compare_command',
+    '--report': 'handle_report_command',
+    '--report-comparison': 'handle_report_comparison_command',
+    '--current': 'handle_current_command',
+    '--history': 'handle_history_command',
+}
+
+
+@functools.lru_cache(maxsize=1)
+def build_parser():
+    """Build the command-line argument parser (once per process)"""
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Windows Laptop Battery Tester - Monitor battery discharge and generate reports',
+        epilog=CLI_EPILOG,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+
+    # Information commands
+    parser.add_argument('--list', action='store_true',
+                      help='Show all tested laptops with summary statistics')
+    parser.add_argument('--compare', action='store_true',
+                      help='Show comparison view sorted by runtime (use --sort to change)')
+    parser.add_argument('--current', action='store_true',
+                      help='Show only current laptop\'s detailed results')
+    parser.add_argument('--history', nargs='?', const=True, metavar='LAPTOP_ID',
+                      help='Show test history for laptop (or current if omitted)')
+
+    # Report commands
+    parser.add_argument('--report', nargs='?', const=True, metavar='LAPTOP_ID',
+                      help='Generate JPEG report for laptop (or current if omitted)')
+    parser.add_argument('--report-comparison', action='store_true',
+                      help='Generate comparison report for all laptops')
+    parser.add_argument('--auto-open', action='store_true',
+                      help='Automatically open generated reports')
+
+    # Test control
+    parser.add_argument('--resume', action='store_true',
+                      help='Resume interrupted test (skip confirmation prompt)')
+    parser.add_argument('--validate', action='store_true',
+                      help='Run pre-test validation checks only (don\'t start test)')
+    parser.add_argument('--notes', type=str, metavar='TEXT',
+                      help='Add notes/comments to test run (use quotes for spaces)')
+
+    # Configuration options
+    parser.add_argument('--low-battery', type=int, metavar='PERCENT', default=10,
+                      help='Low battery warning threshold (default: 10%%)')
+    parser.add_argument('--backup-interval', type=int, metavar='MINUTES', default=5,
+                      help='Backup interval in minutes (default: 5)')
+    parser.add_argument('--poll-target-delta', type=float, metavar='PERCENT',
+                      help='Sample about every PERCENT of battery drop; poll interval adapts '
+                           'to the discharge rate within 5-60s (default: 0.1)')
+    parser.add_argument('--auto-start', action='store_true',
+                      help='Auto-start test when AC power is disconnected')
+    parser.add_argument('--skip-validation', action='store_true',
+                      help='Skip pre-test validation (use with caution)')
+    parser.add_argument('--sort', choices=['runtime', 'discharge_rate', 'battery_health'],
+                      default='runtime', metavar='FIELD',
+                      help='Sort field for comparison view (default: runtime)')
+    parser.add_argument('--preset', choices=list(PRESETS.keys()),
+                      metavar='PRESET', help='Test preset: ' + ', '.join(PRESETS.keys()))
+    parser.add_argument('--export-csv', action='store_true',
+                      help='Export test results to CSV after completion')
+    parser.add_argument('--config', nargs='?', const='show', metavar='KEY=VALUE',
+                      help='Show or set config (e.g. --config low_battery_threshold=15)')
+    parser.add_argument('--debug', action='store_true',
+                      help='Enable debug logging to file (logs/battery_tester_debug_*.log)')
+
+    # Utility
+    parser.add_argument('--version', action='version', version=VERSION_STRING)
+    return parser
 
 
 class BatteryTester:
     """Main battery tester application"""
     
     def __init__(self):
-        log_debug("Initializing BatteryTester", 'info')
+        log_debug("Initializing BatteryTester", level='info')
 
         self.config = TestConfig()
         self.data_logger = DataLogger()
-        log_debug(f"DataLogger initialized. Data file: {self.data_logger.data_file}", 'debug')
-
-        self.battery_monitor = BatteryMonitor()
-        log_debug("BatteryMonitor initialized", 'debug')
-
-        self.power_manager = PowerManager()
-        log_debug("PowerManager initialized", 'debug')
-
-        self.test_validator = TestValidator()
-        log_debug("TestValidator initialized", 'debug')
-
-        self.test_resumer = TestResumer(self.data_logger)
-        log_debug("TestResumer initialized", 'debug')
+        log_debug("DataLogger initialized. Data file: %s", self.data_logger.data_file, level='debug')
 
-        self.results_viewer = ResultsViewer(self.data_logger)
-        log_debug("ResultsViewer initialized", 'debug')
-
-        self.report_generator = ReportGenerator(self.data_logger)
-        log_debug("ReportGenerator initialized", 'debug')
+        # The remaining components are created on first use (see the properties
+        # below), so information commands such as --list skip their setup
 
         self.running = False
+        self._laptop_id = None  # cached by identify_laptop()
+        # Power/low-battery events waiting to be written in one batch
+        self._pending_events = []
+        self._events_laptop_id = None
+        # Set by power-change notifications to cut the loop's sleep short
+        self._wake_event = threading.Event()
+        # Set by the signal handler so sleeping waits return immediately
+        self._stop_event = threading.Event()
         self.test_start_time = None
         self.test_notes = None
         self.low_battery_threshold = self.config.get('low_battery_threshold', 10)
         self.backup_interval = self.config.get('backup_interval', 5)
+        self.poll_target_delta = _parse_poll_target_delta(self.config.get('poll_target_delta', 0.1))
         self.skip_validation = False
         self.selected_preset = None
         self.csv_export = self.config.get('csv_export', False)
+        # Per-sample progress output is only drawn on an interactive console;
+        # redirected runs keep just the milestone messages
+        self._is_tty = sys.stdout is not None and sys.stdout.isatty()
         
-        # Setup signal handlers
-        signal.signal(signal.SIGINT, self._signal_handler)
-        if sys.platform == 'win32':
-            signal.signal(signal.SIGTERM, self._signal_handler)
+        # Setup signal handlers and the exit flush (installed once per process)
+        _install_signals()
+        _signal_targets.add(self)
         
-        log_debug("BatteryTester initialization complete", 'info')
+        log_debug("BatteryTester initialization complete", level='info')
+    
+    @functools.cached_property
+    def test_resumer(self):
+        from test_resumer import TestResumer
+        log_debug("TestResumer initialized", level='debug')
+        return TestResumer(self.data_logger)
+
+    @functools.cached_property
+    def battery_monitor(self):
+        from battery_monitor import BatteryMonitor
+        log_debug("BatteryMonitor initialized", level='debug')
+        return BatteryMonitor()
+
+    @functools.cached_property
+    def power_manager(self):
+        from power_manager import PowerManager
+        log_debug("PowerManager initialized", level='debug')
+        return PowerManager()
+
+    @functools.cached_property
+    def test_validator(self):
+        from test_validator import TestValidator
+        log_debug("TestValidator initialized", level='debug')
+        return TestValidator()
+
+    @functools.cached_property
+    def results_viewer(self):
+        from results_viewer import ResultsViewer
+        log_debug("ResultsViewer initialized", level='debug')
+        return ResultsViewer(self.data_logger)
+
+    @functools.cached_property
+    def report_generator(self):
+        # Imported here: Pillow is only needed when a report is generated
+        from report_generator import ReportGenerator
+        log_debug("ReportGenerator initialized", level='debug')
+        return ReportGenerator(self.data_logger, scale=self.config.get('report_scale', 1.0))
     
     def _signal_handler(self, signum, frame):
         """Handle Ctrl+C gracefully"""
-        log_debug(f"Signal received: {signum}", 'warning')
+        log_debug("Signal received: %s", signum, level='warning')
         print("\n\n⚠️  Interrupted by user")
         self.running = False
+        self._stop_event.set()
+        self._wake_event.set()
+        # Write buffered entries now in case the process doesn't get to the
+        # test loop's cleanup (e.g. the console is closing)
+        self.data_logger.flush()
     
-    def identify_laptop(self):
-        """Identify current laptop"""
-        log_debug("Identifying laptop...", 'info')
-        
-        laptop_id = generate_laptop_id()
-        log_debug(f"Generated laptop ID: {laptop_id}", 'info')
+    def _queue_event(self, kind, ac_connected, battery_percent=None):
+        """Queue a power event for the next batched write (see _flush_events)"""
+        event = {
+            'timestamp': now_iso(),
+            'event': kind,
+        }
+        if kind != 'low_battery_warning':
+            event['ac_connected'] = ac_connected
+        if battery_percent is not None:
+            event['battery_percent'] = battery_percent
+        self._pending_events.append(event)
+    
+    def _flush_events(self):
+        """Write all queued power events with a single save"""
+        events, self._pending_events = self._pending_events, []
+        if events and self._events_laptop_id:
+            self.data_logger.add_power_events_bulk(self._events_laptop_id, events)
+    
+    def _emergency_flush(self):
+        """Write any events and entries still buffered in memory (see _flush_at_exit)"""
+        try:
+            self._flush_events()
+            self.data_logger.flush()
+        except Exception as e:
+            print(f"Warning: Could not flush data on exit: {e}")
+    
+    def _config_hash(self):
+        """Hash of the settings that shape a run, checked when it is resumed"""
+        return config_hash({
+            'preset': self.selected_preset,
+            'low_battery_threshold': self.low_battery_threshold,
+        })
+    
+    def identify_laptop(self, refresh=False):
+        """
+        Identify current laptop. The hardware scan runs once per process;
+        later calls return the same ID unless refresh=True.
+        """
+        if self._laptop_id is not None and not refresh:
+            return self._laptop_id
+        from hardware_info import get_hardware_info, get_battery_info, generate_laptop_id
+        log_debug("Identifying laptop...", level='info')
         
-        hardware_info = get_hardware_info()
-        log_debug(f"Hardware info: {hardware_info}", 'debug')
+        # Collect the hardware details once; the ID is derived from them
+        hardware_info = get_hardware_info(refresh=refresh)
+        laptop_id = generate_laptop_id(hardware_info)
+        log_debug("Generated laptop ID: %s", laptop_id, level='info')
+        log_debug("Hardware info: %s", hardware_info, level='debug')
         
         battery_info = get_battery_info()
-        log_debug(f"Battery info: {battery_info}", 'debug')
+        log_debug("Battery info: %s", battery_info, level='debug')
         
         self.data_logger.initialize_laptop(laptop_id, hardware_info, battery_info)
-        log_debug(f"Laptop initialized in data logger", 'info')
+        log_debug("Laptop initialized in data logger", level='info')
         
+        self._laptop_id = laptop_id
         return laptop_id
     
     def run_validation(self, laptop_id, require_100_percent=True, interactive=True):
         """Run pre-test validation"""
-        log_debug(f"Running validation for laptop: {laptop_id}", 'info')
+        log_debug("Running validation for laptop: %s", laptop_id, level='info')
 
         print("\n" + "=" * 70)
         print("PRE-TEST VALIDATION")
@@ -171,11 +461,11 @@ class BatteryTester:
             laptop_id, self.data_logger, require_100_percent
         )
 
-        log_debug(f"Validation result - Valid: {is_valid}, Errors: {len(errors)}, Warnings: {len(warnings)}", 'info')
+        log_debug("Validation result - Valid: %s, Errors: %s, Warnings: %s", is_valid, len(errors), len(warnings), level='info')
         self.test_validator.display_results()
 
         if not is_valid:
-            log_debug("Validation failed", 'error')
+            log_debug("Validation failed", level='error')
             if interactive:
                 ok = self._prompt_yes_no_choice(
                     "VALIDATION FAILED",
@@ -189,7 +479,7 @@ class BatteryTester:
             return False
 
         if warnings:
-            log_debug("Validation has warnings, prompting user", 'info')
+            log_debug("Validation has warnings, prompting user", level='info')
             if interactive:
                 ok = self._prompt_yes_no_choice(
                     "VALIDATION WARNINGS",
@@ -204,7 +494,7 @@ class BatteryTester:
                 if response != 'y':
                     return False
 
-        log_debug("Validation passed", 'info')
+        log_debug("Validation passed", level='info')
         return True
 
     def _prompt_yes_no_choice(self, title, options, confirm_on=None):
@@ -215,28 +505,54 @@ class BatteryTester:
         print()
         for i, (label, _) in enumerate(options, 1):
             print(f"  {i}. {label}")
+        valid = ''.join(str(i) for i in range(1, len(options) + 1))
+        try:
+            choice = self._prompt_choice("\nSelect option: ", valid)
+            log_debug("User selected: %s", choice, level='debug')
+            idx = int(choice) - 1
+            if confirm_on is not None and idx == confirm_on:
+                conf = input(f"\n⚠️  {options[idx][0]}. Are you sure? (yes/no): ").strip().lower()
+                if conf != 'yes':
+                    return False
+            return options[idx][1]
+        except (KeyboardInterrupt, EOFError):
+            return False
+
+    def _prompt_choice(self, prompt, valid):
+        """
+        Read a single-character choice from valid.
+        On Windows the key is read directly with msvcrt.getwch() (no Enter
+        needed); elsewhere falls back to a line read with input().
+        """
+        if sys.platform == 'win32':
+            import msvcrt
+            print(prompt, end='', flush=True)
+            while True:
+                key = msvcrt.getwch()
+                if key == '\x03':
+                    raise KeyboardInterrupt
+                if key == '\x1a':
+                    raise EOFError
+                if key in valid:
+                    print(key)
+                    return key
         while True:
-            try:
-                choice = input("\nSelect option: ").strip()
-                log_debug(f"User selected: {choice}", 'debug')
-                idx = int(choice) - 1
-                if 0 <= idx < len(options):
-                    if confirm_on is not None and idx == confirm_on:
-                        conf = input(f"\n⚠️  {options[idx][0]}. Are you sure? (yes/no): ").strip().lower()
-                        if conf != 'yes':
-                            return False
-                    return options[idx][1]
-                print(f"Invalid choice. Please enter 1-{len(options)}.")
-            except ValueError:
-                print(f"Invalid input. Please enter 1-{len(options)}.")
-            except (KeyboardInterrupt, EOFError):
-                return False
+            choice = input(prompt).strip()
+            if len(choice) == 1 and choice in valid:
+                return choice
+            print(f"Invalid choice. Please enter one of: {', '.join(valid)}.")
     
     def start_test(self, laptop_id, resume_data=None, auto_start=False):
         """Start battery test"""
-        log_debug(f"Starting battery test for laptop: {laptop_id}", 'info')
+        from battery_health import get_battery_health
+        from charging_monitor import ChargingMonitor
+        from discharge_analyzer import DischargeAnalyzer
+        from low_battery_handler import LowBatteryHandler
+        from metadata_logger import collect_test_metadata
+        from power_event_logger import PowerEventLogger, PowerChangeWatcher
+        log_debug("Starting battery test for laptop: %s", laptop_id, level='info')
         if resume_data:
-            log_debug(f"Resuming test with data: {resume_data}", 'info')
+            log_debug("Resuming test with data: %s", resume_data, level='info')
 
         W = 70
 
@@ -250,11 +566,10 @@ class BatteryTester:
         self.power_manager.prevent_sleep()
         print("OK")
 
-        metadata = collect_test_metadata(original_power_plan=orig_name, active_power_plan='High Performance', notes=self.test_notes)
-        battery_info = get_battery_health()
-
         run_id = None
         if resume_data:
+            # The run already holds its metadata and battery info; skip the
+            # WMI/subprocess probes (the settings hash was checked by TestResumer)
             run_id = resume_data['run_id']
             test_run = self.data_logger.get_current_test_run(laptop_id)
             if test_run:
@@ -262,34 +577,48 @@ class BatteryTester:
                 self.test_start_time = resume_data['start_time']
                 print(f"\n  Resuming test run: {run_id}")
         else:
+            metadata = collect_test_metadata(original_power_plan=orig_name, active_power_plan='High Performance', notes=self.test_notes)
+            battery_info = get_battery_health(self.battery_monitor.get_battery_status(need_capacity=True))
             run_id = self.data_logger.create_test_run(laptop_id, metadata, battery_info)
             self.test_start_time = datetime.now()
             print(f"\n  Test run: {run_id}")
 
+        self.battery_monitor.connect()
+
+        # Subscribe to power-change notifications before waiting for the unplug
+        power_watcher = PowerChangeWatcher(self._wake_event)
+        wait_event = self._wake_event if power_watcher.start() else None
+
         if auto_start and not resume_data:
             print("\n" + "=" * W)
             print("  AUTO-START MODE")
             print("=" * W)
             print("  Waiting for AC power to be disconnected...")
             print("  (Plug in now, then disconnect to begin automatically)\n")
-            self.battery_monitor.wait_for_battery_power()
+            self.battery_monitor.wait_for_battery_power(wait_event)
             self.test_start_time = datetime.now()
             status = self.battery_monitor.get_battery_status()
             print(f"\n  ✓ Battery power detected at {self.test_start_time.strftime('%H:%M:%S')}")
             print(f"  Starting battery: {status['percentage']:.1f}%\n")
         else:
             print("\n  Waiting for AC power to be disconnected...")
-            if not self.battery_monitor.wait_for_battery_power():
+            if not self.battery_monitor.wait_for_battery_power(wait_event):
+                power_watcher.stop()
+                self.battery_monitor.close()
                 return False
 
         status = self.battery_monitor.get_battery_status()
-        self.data_logger.add_power_event(laptop_id, 'test_started', False, status['percentage'])
+        self._events_laptop_id = laptop_id
+        self._queue_event('test_started', False, status['percentage'])
 
-        charging_monitor = ChargingMonitor(grace_period=30)
+        # A pause/resume wakes the loop so the next sample follows at once
+        charging_monitor = ChargingMonitor(grace_period=30, on_change=lambda state: self._wake_event.set())
         low_battery_handler = LowBatteryHandler(low_battery_threshold=self.low_battery_threshold)
         discharge = DischargeAnalyzer()
         power_events = PowerEventLogger()
+        self._wake_event.clear()
         self.data_logger.backup_manager.keep_backups = 5
+        self.data_logger.backup_manager.start_worker()
 
         max_duration = None
         if self.selected_preset and self.selected_preset != 'full_discharge':
@@ -297,7 +626,7 @@ class BatteryTester:
             max_duration = preset.get('max_duration_minutes')
 
         total_pause_time = 0
-        pause_start_time = None
+        pause_start_mono = None
 
         preset_label = f" [{PRESETS[self.selected_preset]['name']}]" if self.selected_preset else ""
         print()
@@ -308,57 +637,104 @@ class BatteryTester:
         print("-" * W)
 
         self.running = True
+        self._stop_event.clear()
         last_battery_percent = None
+        # True while a transient '\r' status line (grace countdown) is on screen
+        status_line_open = False
+        run_config_hash = self._config_hash()
+        backup_period = self.backup_interval * 60
+        next_backup_at = time.monotonic() + backup_period
+
+        # Convert the wall-clock start into a fixed offset once; the loop then
+        # only needs monotonic time (also immune to clock changes)
+        start_mono = time.monotonic()
+        if resume_data:
+            base_elapsed = (resume_data['last_elapsed_seconds']
+                            + (datetime.now() - resume_data['start_time']).total_seconds())
+        else:
+            base_elapsed = (datetime.now() - self.test_start_time).total_seconds()
 
         try:
             while self.running:
                 status = self.battery_monitor.get_battery_status()
                 battery_percent = status['percentage']
                 if battery_percent is None:
-                    time.sleep(5)
+                    if self._stop_event.wait(5):
+                        break
                     continue
 
-                charge_state = charging_monitor.update()
-
-                if charge_state == 'paused' and pause_start_time is None:
-                    pause_start_time = datetime.now()
+                # One clock reading per pass drives the pause, grace and
+                # elapsed arithmetic below
+                now = time.monotonic()
+                # Reuse this poll's status rather than querying the battery again
+                charge_state = charging_monitor.update(status, now)
+                grace_left = charging_monitor.get_grace_remaining(now) if charge_state == 'grace' else 0
+                state_changed = False
+
+                if charge_state == 'paused' and pause_start_mono is None:
+                    pause_start_mono = now
+                    state_changed = True
                     print(f"\n  ⏸  Charger connected. Test paused. Disconnect to resume.")
+                    status_line_open = False
                 elif charge_state == 'resumed':
-                    if pause_start_time is not None:
-                        pd = (datetime.now() - pause_start_time).total_seconds()
+                    if pause_start_mono is not None:
+                        pd = now - pause_start_mono
                         total_pause_time += pd
-                        pause_start_time = None
+                        pause_start_mono = None
+                        state_changed = True
                         print(f"\n  ▶  Resumed (+{pd/60:.1f}min pause)")
+                        status_line_open = False
+                if state_changed:
+                    # Save the monitor's charging event with the next batched write
+                    self._pending_events.extend(charging_monitor.drain_events())
 
-                if resume_data:
-                    base_elapsed = resume_data['last_elapsed_seconds']
-                    current_time = (datetime.now() - resume_data['start_time']).total_seconds()
-                else:
-                    base_elapsed = 0
-                    current_time = (datetime.now() - self.test_start_time).total_seconds()
-
-                elapsed = base_elapsed + current_time - total_pause_time
-                if pause_start_time is not None:
-                    elapsed -= (datetime.now() - pause_start_time).total_seconds()
+                elapsed = base_elapsed + (now - start_mono) - total_pause_time
+                if pause_start_mono is not None:
+                    elapsed -= now - pause_start_mono
 
-                sys_event = power_events.poll()
+                sys_event = power_events.poll(status)
                 if sys_event:
-                    self.data_logger.add_power_event(laptop_id, 'system_' + sys_event['event'], sys_event['event'] == 'ac_connected', sys_event.get('battery_percent'))
+                    self._queue_event('system_' + sys_event['event'], sys_event['event'] == 'ac_connected', sys_event.get('battery_percent'))
 
                 if not charging_monitor.is_paused:
                     rate, eta_mins = discharge.update(battery_percent, elapsed)
                 else:
                     rate, eta_mins = 0, 0
 
-                is_low, low_event = low_battery_handler.check_low_battery(battery_percent)
+                is_low, low_event = low_battery_handler.check_low_battery(battery_percent, status)
                 if is_low and low_event:
-                    self.data_logger.add_low_battery_event(laptop_id, battery_percent)
+                    self._queue_event('low_battery_warning', False, battery_percent)
+                    state_changed = True
 
                 logged = self.data_logger.add_entry(laptop_id, battery_percent, elapsed, status['charging'])
-                if self.data_logger.backup_manager.should_backup(interval_minutes=self.backup_interval):
-                    self.data_logger.backup_manager.create_backup()
+                # Write the batch right away on a pause/resume or low-battery
+                # warning, and near empty where the laptop may power off any moment
+                if state_changed or battery_percent <= self.data_logger.flush_below_percent:
+                    self._flush_events()
+                    self.data_logger.flush()
+                if now >= next_backup_at:
+                    # Backups copy the file on disk, so write buffered data first
+                    self._flush_events()
+                    self.data_logger.flush()
+                    self.data_logger.backup_manager.schedule_backup()
+                    # Count from now, so a long system sleep can't leave a
+                    # backlog of overdue deadlines firing on every pass
+                    next_backup_at = now + backup_period
 
                 if logged:
+                    # Small fsynced checkpoint so a crash loses none of the
+                    # entries still buffered in memory; the fsync runs on the
+                    # backup worker so it can't stall the sampling cadence
+                    self.data_logger.backup_manager.submit(self.data_logger.write_checkpoint, {
+                        'config_hash': run_config_hash,
+                        'run_id': run_id,
+                        'laptop_id': laptop_id,
+                        'elapsed': elapsed,
+                        'last_percent': battery_percent,
+                        'total_pause_time': total_pause_time,
+                    })
+
+                if logged and self._is_tty:
                     runtime_str = self.results_viewer.format_time(elapsed)
                     bar = _battery_bar(battery_percent, 20)
                     state = '⏸ PAUSED' if charging_monitor.is_paused else '▶ RUNNING'
@@ -368,12 +744,17 @@ class BatteryTester:
                         eta_str = f"{eh}h{em:02d}m"
                     else:
                         eta_str = " -- "
+                    if status_line_open:
+                        print()
+                        status_line_open = False
                     print(f"  {runtime_str:>8s}  {battery_percent:5.1f}% {bar}  {rate_str:>7s}  {eta_str:>10s}  {state}")
 
-                if charge_state == 'grace':
-                    gr = charging_monitor.grace_remaining
-                    if 0 < gr <= 10:
-                        print(f"  ⚡ Charger detected! Pausing in {gr}s unless disconnected...")
+                if charge_state == 'grace' and self._is_tty:
+                    if 0 < grace_left <= 10:
+                        # Count down in place instead of printing a new line per poll
+                        sys.stdout.write(f"\r  ⚡ Charger detected! Pausing in {grace_left:2d}s unless disconnected...")
+                        sys.stdout.flush()
+                        status_line_open = True
 
                 if battery_percent <= 0:
                     print("\n  ✓ Battery depleted. Test complete.")
@@ -385,32 +766,53 @@ class BatteryTester:
                     break
 
                 last_battery_percent = battery_percent
-                time.sleep(self.config.get('log_interval_seconds', 10))
+                # Sample roughly every poll_target_delta % of drain; while paused,
+                # poll quickly so the resume is noticed promptly
+                if charging_monitor.is_paused:
+                    interval = 5
+                else:
+                    interval = discharge.suggest_poll_interval(
+                        self.poll_target_delta, default=self.config.get('log_interval_seconds', 10)
+                    )
+                if charge_state == 'grace':
+                    # Wake when the grace period runs out so the pause starts on time
+                    interval = min(interval, max(1, grace_left))
+                # Sleep until the next sample is due, until Windows reports a
+                # power change (charger plugged/unplugged), or until Ctrl+C
+                self._wake_event.wait(interval)
+                self._wake_event.clear()
         except KeyboardInterrupt:
             print("\n\n  ⚠  Test interrupted by user")
         finally:
+            power_watcher.stop()
+            self.battery_monitor.close()
+            self.data_logger.backup_manager.stop_worker()
+            self._pending_events.extend(charging_monitor.drain_events())
+            self._flush_events()
+            self.data_logger.flush()
             final_status = low_battery_handler.determine_test_status(last_battery_percent)
             self.data_logger.finalize_test_run(laptop_id, final_status, last_battery_percent)
 
             print("\n  Restoring power settings...", end=' ')
             self.power_manager.restore_power_plan()
+            self.power_manager.restore_sleep_settings()
             print("OK")
 
+            # Render the report in the background while the summary prints
+            report_result = {}
+            report_thread = None
+            if run_id:
+                report_thread = threading.Thread(
+                    target=self._generate_report_safe, args=(laptop_id, run_id, report_result),
+                    name='report-generator'
+                )
+                report_thread.start()
+
             summary = discharge.get_summary()
             print(f"\n  Discharge Statistics:")
             print(f"    Avg rate:  {summary['avg_rate_percent_per_hour']}%/hr")
             print(f"    Peak rate: {summary['short_term_rate_percent_per_hour']}%/hr")
 
-            if run_id:
-                print("\n  Generating report...", end=' ')
-                try:
-                    report_path = self.report_generator.generate_report(laptop_id, run_id)
-                    print(f"OK\n  {report_path}")
-                    if self.config.get('auto_open_report', False):
-                        self.report_generator._open_report(report_path)
-                except Exception as e:
-                    print(f"skipped ({e})")
-
             if self.csv_export and run_id:
                 try:
                     self.results_viewer.export_csv(laptop_id, run_id)
@@ -422,49 +824,24 @@ class BatteryTester:
             print("  TEST COMPLETE")
             print("=" * W)
             self.results_viewer.display_laptop_results(laptop_id, laptop_id)
-        
-        print("\n" + "=" * 70)
-        print("STARTING BATTERY TEST")
-        print("=" * 70)
-        
-        # Set power plan to High Performance
-        print("\nSetting power plan to High Performance...")
-        log_debug("Attempting to set power plan to High Performance", 'info')
-        success, orig_guid, orig_name = self.power_manager.set_high_performance_plan()
-        log_debug(f"Power plan change result: success={success}, original={orig_name}", 'info')
-        if not success:
-            log_debug("Failed to set High Performance plan", 'warning')
-            print("Warning: Could not set High Performance plan")
-        
-        # Prevent sleep
-        print("Preventing sleep/hibernate...")
-        log_debug("Preventing sleep/hibernate", 'info')
-        sleep_result = self.power_manager.prevent_sleep()
-        log_debug(f"Sleep prevention result: {sleep_result}", 'info')
-        
-        # Collect metadata
-        metadata = collect_test_metadata(
-            original_power_plan=orig_name,
-            active_power_plan='High Performance',
-            notes=self.test_notes
-        )
-        
-        # Get battery info
-        battery_info = get_battery_health()
-        
-        run_id = None
-        if resume_data:
-            # Resume existing test
-            run_id = resume_data['run_id']
-            test_run = self.data_logger.get_current_test_run(laptop_id)
-            if test_run:
-                test_run['resumed'] = True
-                self.test_start_time = resume_data['start_time']
-                print(f"Resuming test run: {run_id}")
-        else:
-            # New test run
-            run_id = self.data_logger.create_test_run(laptop_id, metadata, battery_info)
-            self.test_start_time = datetime.now()
+
+            if report_thread is not None:
+                report_thread.join()
+                if 'path' in report_result:
+                    print(f"\n  Report: {report_result['path']}")
+                    if self.config.get('auto_open_report', False):
+                        self.report_generator._open_report(report_result['path'])
+                else:
+                    print(f"\n  Report: skipped ({report_result.get('error')})")
+
+    def _generate_report_safe(self, laptop_id, run_id, result):
+        """Generate a run report, storing 'path' or 'error' in result (thread target)"""
+        try:
+            result['path'] = self.report_generator.generate_report(laptop_id, run_id)
+        except Exception as e:
+            log_debug("Report generation failed: %s", e, level='error')
+            result['error'] = e
+    
     def handle_list_command(self):
         """Handle --list command"""
         self.results_viewer.display_comparison()
@@ -477,7 +854,7 @@ class BatteryTester:
         """Handle --report-comparison command"""
         try:
             report_path = self.report_generator.generate_comparison_report()
-            print(f"✓ Comparison report generated: {report_path}")
+            print(f"✓ Comparison report: {report_path}")
             if auto_open:
                 self.report_generator._open_report(report_path)
         except Exception as e:
@@ -537,7 +914,7 @@ class BatteryTester:
         if incomplete_test:
             print("\n⚠️  Incomplete test found!")
             if self.test_resumer.prompt_resume(incomplete_test):
-                resume_data = self.test_resumer.resume_test(laptop_id)
+                resume_data = self.test_resumer.resume_test(laptop_id, self._config_hash())
                 self.start_test(laptop_id, resume_data, auto_start=auto_start)
                 return
             else:
@@ -574,7 +951,7 @@ class BatteryTester:
                 return
             
             if self.test_resumer.prompt_resume(incomplete_test):
-                resume_data = self.test_resumer.resume_test(laptop_id)
+                resume_data = self.test_resumer.resume_test(laptop_id, self._config_hash())
                 self.start_test(laptop_id, resume_data)
             else:
                 print("\nResume cancelled.")
@@ -593,26 +970,27 @@ class BatteryTester:
         print("=" * 70)
         
         try:
-            laptop_id = self.data_logger.data.get('current_laptop_id')
+            data = self.data_logger.data
+            laptop_id = data.get('current_laptop_id')
+            known = data.get('laptops') or {}
             
             if not laptop_id:
                 # Show list of laptops
-                if not self.data_logger.data.get('laptops'):
+                if not known:
                     print("\nNo test data found.")
                     return
                 
                 print("\nAvailable laptops:")
-                laptops = list(self.data_logger.data['laptops'].keys())
-                for i, lid in enumerate(laptops, 1):
+                laptops = {}
+                for i, lid in enumerate(known, 1):
                     print(f"  {i}. {lid}")
+                    laptops[i] = lid
                 
                 try:
                     choice = input("\nSelect laptop number (or press Enter for current): ").strip()
                     if choice:
-                        idx = int(choice) - 1
-                        if 0 <= idx < len(laptops):
-                            laptop_id = laptops[idx]
-                        else:
+                        laptop_id = laptops.get(int(choice))
+                        if laptop_id is None:
                             print("Invalid selection.")
                             return
                 except (ValueError, KeyboardInterrupt, EOFError):
@@ -637,26 +1015,27 @@ class BatteryTester:
         print("=" * 70)
         
         try:
-            laptop_id = self.data_logger.data.get('current_laptop_id')
+            data = self.data_logger.data
+            laptop_id = data.get('current_laptop_id')
+            known = data.get('laptops') or {}
             
-            if not laptop_id or laptop_id not in self.data_logger.data.get('laptops', {}):
+            if not laptop_id or laptop_id not in known:
                 # Show list of laptops
-                if not self.data_logger.data.get('laptops'):
+                if not known:
                     print("\nNo test data found.")
                     return
                 
                 print("\nAvailable laptops:")
-                laptops = list(self.data_logger.data['laptops'].keys())
-                for i, lid in enumerate(laptops, 1):
+                laptops = {}
+                for i, lid in enumerate(known, 1):
                     print(f"  {i}. {lid}")
+                    laptops[i] = lid
                 
                 try:
                     choice = input("\nSelect laptop number: ").strip()
                     if choice:
-                        idx = int(choice) - 1
-                        if 0 <= idx < len(laptops):
-                            laptop_id = laptops[idx]
-                        else:
+                        laptop_id = laptops.get(int(choice))
+                        if laptop_id is None:
                             print("Invalid selection.")
                             return
                     else:
@@ -701,83 +1080,27 @@ class BatteryTester:
     
     def run(self):
         """Main run method"""
-        parser = argparse.ArgumentParser(
-            description='Windows Laptop Battery Tester - Monitor battery discharge and generate reports',
-            epilog='''
-Examples:
-  battery_tester.exe                    # Start new test (interactive)
-  battery_tester.exe --list             # Show all laptops summary
-  battery_tester.exe --compare          # Compare all laptops sorted by runtime
-  battery_tester.exe --current          # Show current laptop results
-  battery_tester.exe --report           # Generate report for current laptop
-  battery_tester.exe --report LAPTOP-123 # Generate report for specific laptop
-  battery_tester.exe --resume           # Resume interrupted test
-  battery_tester.exe --validate         # Run pre-test checks only
-  battery_tester.exe --notes "Test after battery replacement"
-  battery_tester.exe --history LAPTOP-123 # Show test history
-  battery_tester.exe --auto-open        # Auto-open report after generation
-  battery_tester.exe --low-battery 15   # Set low battery threshold to 15%%
-  battery_tester.exe --backup-interval 10 # Backup every 10 minutes
-            ''',
-            formatter_class=argparse.RawDescriptionHelpFormatter
-        )
-        
-        # Information commands
-        parser.add_argument('--list', action='store_true',
-                          help='Show all tested laptops with summary statistics')
-        parser.add_argument('--compare', action='store_true',
-                          help='Show comparison view sorted by runtime (use --sort to change)')
-        parser.add_argument('--current', action='store_true',
-                          help='Show only current laptop\'s detailed results')
-        parser.add_argument('--history', nargs='?', const=True, metavar='LAPTOP_ID',
-                          help='Show test history for laptop (or current if omitted)')
-        
-        # Report commands
-        parser.add_argument('--report', nargs='?', const=True, metavar='LAPTOP_ID',
-                          help='Generate JPEG report for laptop (or current if omitted)')
-        parser.add_argument('--report-comparison', action='store_true',
-                          help='Generate comparison report for all laptops')
-        parser.add_argument('--auto-open', action='store_true',
-                          help='Automatically open generated reports')
-        
-        # Test control
-        parser.add_argument('--resume', action='store_true',
-                          help='Resume interrupted test (skip confirmation prompt)')
-        parser.add_argument('--validate', action='store_true',
-                          help='Run pre-test validation checks only (don\'t start test)')
-        parser.add_argument('--notes', type=str, metavar='TEXT',
-                          help='Add notes/comments to test run (use quotes for spaces)')
-        
-        # Configuration options
-        parser.add_argument('--low-battery', type=int, metavar='PERCENT', default=10,
-                          help='Low battery warning threshold (default: 10%%)')
-        parser.add_argument('--backup-interval', type=int, metavar='MINUTES', default=5,
-                          help='Backup interval in minutes (default: 5)')
-        parser.add_argument('--auto-start', action='store_true',
-                          help='Auto-start test when AC power is disconnected')
-        parser.add_argument('--skip-validation', action='store_true',
-                          help='Skip pre-test validation (use with caution)')
-        parser.add_argument('--sort', choices=['runtime', 'discharge_rate', 'battery_health'],
-                          default='runtime', metavar='FIELD',
-                          help='Sort field for comparison view (default: runtime)')
-        parser.add_argument('--preset', choices=list(PRESETS.keys()),
-                          metavar='PRESET', help='Test preset: ' + ', '.join(PRESETS.keys()))
-        parser.add_argument('--export-csv', action='store_true',
-                          help='Export test results to CSV after completion')
-        parser.add_argument('--config', nargs='?', const='show', metavar='KEY=VALUE',
-                          help='Show or set config (e.g. --config low_battery_threshold=15)')
-        parser.add_argument('--debug', action='store_true',
-                          help='Enable debug logging to file (logs/battery_tester_debug_*.log)')
-        
-        # Utility
-        parser.add_argument('--version', action='version', version='Battery Tester 1.0.0')
-        
+        # A lone information flag needs none of the options: dispatch it
+        # straight away without building the argument parser
+        argv = sys.argv[1:]
+        if len(argv) == 1 and argv[0] in _SIMPLE_COMMANDS:
+            log_debug("Executing %s command (fast path)", argv[0], level='info')
+            try:
+                getattr(self, _SIMPLE_COMMANDS[argv[0]])()
+            except Exception as e:
+                log_debug("Error executing command: %s", e, level='error')
+                log_debug("Exception traceback:", level='exception')
+                print(f"\n❌ Error: {e}")
+                traceback.print_exc()
+            return
+
+        parser = build_parser()
         args = parser.parse_args()
         
         # Enable debug logging if requested
         if args.debug:
             setup_debug_logging()
-            log_debug("Debug mode enabled via command-line argument", 'info')
+            log_debug("Debug mode enabled via command-line argument", level='info')
 
         # Handle --config
         if args.config:
@@ -798,63 +1121,60 @@ Examples:
             self.config.show()
             return
 
-        # Store configuration
+        # Store configuration (collected so the config file is written once)
+        config_updates = {}
         if args.notes:
             self.test_notes = args.notes
-            self.config.set('notes', args.notes)
-            log_debug(f"Test notes set: {args.notes}", 'info')
+            config_updates['notes'] = args.notes
+            log_debug("Test notes set: %s", args.notes, level='info')
 
         self.csv_export = args.export_csv
         self.selected_preset = args.preset
 
         self.low_battery_threshold = args.low_battery
-        self.config.set('low_battery_threshold', args.low_battery)
-        log_debug(f"Low battery threshold set to: {args.low_battery}%", 'debug')
+        config_updates['low_battery_threshold'] = args.low_battery
+        log_debug("Low battery threshold set to: %s%%", args.low_battery, level='debug')
 
         self.backup_interval = args.backup_interval
-        self.config.set('backup_interval', args.backup_interval)
-        log_debug(f"Backup interval set to: {args.backup_interval} minutes", 'debug')
+        config_updates['backup_interval'] = args.backup_interval
+        log_debug("Backup interval set to: %s minutes", args.backup_interval, level='debug')
+
+        if args.poll_target_delta is not None:
+            self.poll_target_delta = _parse_poll_target_delta(args.poll_target_delta)
+            config_updates['poll_target_delta'] = self.poll_target_delta
+            log_debug("Poll target delta set to: %s%%", args.poll_target_delta, level='debug')
+
+        self.config.update(config_updates)
 
         self.skip_validation = args.skip_validation
         if args.skip_validation:
-            log_debug("Validation skipping enabled", 'warning')
+            log_debug("Validation skipping enabled", level='warning')
         
-        # Handle command-line commands (information/viewing)
+        # Handle command-line commands (information/viewing): the first
+        # flag set wins, in this order
+        def laptop_arg(value):
+            # --report/--history without a value parse as const=True: use the current laptop
+            return None if value is True else value
+
+        commands = (
+            ('list', lambda: self.handle_list_command()),
+            ('compare', lambda: self.handle_compare_command(sort_by=args.sort)),
+            ('report', lambda: self.handle_report_command(laptop_arg(args.report), auto_open=args.auto_open)),
+            ('report_comparison', lambda: self.handle_report_comparison_command(auto_open=args.auto_open)),
+            ('current', lambda: self.handle_current_command()),
+            ('history', lambda: self.handle_history_command(laptop_arg(args.history))),
+        )
         try:
-            if args.list:
-                log_debug("Executing --list command", 'info')
-                self.handle_list_command()
-                return
-            
-            if args.compare:
-                log_debug(f"Executing --compare command (sort: {args.sort})", 'info')
-                self.handle_compare_command(sort_by=args.sort)
-                return
-            
-            if args.report:
-                laptop_id = args.report if isinstance(args.report, str) else None
-                log_debug(f"Executing --report command (laptop_id: {laptop_id}, auto_open: {args.auto_open})", 'info')
-                self.handle_report_command(laptop_id, auto_open=args.auto_open)
-                return
-            
-            if args.report_comparison:
-                log_debug(f"Executing --report-comparison command (auto_open: {args.auto_open})", 'info')
-                self.handle_report_comparison_command(auto_open=args.auto_open)
-                return
-            
-            if args.current:
-                log_debug("Executing --current command", 'info')
-                self.handle_current_command()
-                return
-            
-            if args.history:
-                laptop_id = args.history if isinstance(args.history, str) else None
-                log_debug(f"Executing --history command (laptop_id: {laptop_id})", 'info')
-                self.handle_history_command(laptop_id)
-                return
+            for dest, handler in commands:
+                value = getattr(args, dest)
+                if value:
+                    log_debug("Executing --%s command (%s, sort: %s, auto_open: %s)",
+                              dest.replace('_', '-'), value, args.sort, args.auto_open, level='info')
+                    handler()
+                    return
         except Exception as e:
-            log_debug(f"Error executing command: {e}", 'error')
-            log_debug("Exception traceback:", 'exception')
+            log_debug("Error executing command: %s", e, level='error')
+            log_debug("Exception traceback:", level='exception')
             print(f"\n❌ Error: {e}")
             traceback.print_exc()
             return
@@ -862,11 +1182,11 @@ Examples:
         # Identify laptop
         laptop_id = self.identify_laptop()
         print(f"\nCurrent Laptop: {laptop_id}")
-        log_debug(f"Current laptop identified: {laptop_id}", 'info')
+        log_debug("Current laptop identified: %s", laptop_id, level='info')
         
         # Check for existing data and show results if available
         if self.data_logger.data.get('laptops'):
-            log_debug(f"Found existing test data for {len(self.data_logger.data['laptops'])} laptop(s)", 'info')
+            log_debug("Found existing test data for %s laptop(s)", len(self.data_logger.data['laptops']), level='info')
             # Show results with sorting options
             print("\n" + "=" * 70)
             print("EXISTING TEST DATA FOUND")
@@ -879,30 +1199,30 @@ Examples:
         resume_data = None
         
         if incomplete_test:
-            log_debug(f"Incomplete test found: {incomplete_test}", 'info')
+            log_debug("Incomplete test found: %s", incomplete_test, level='info')
             if args.resume:
-                log_debug("Resuming test automatically (--resume flag)", 'info')
-                resume_data = self.test_resumer.resume_test(laptop_id)
+                log_debug("Resuming test automatically (--resume flag)", level='info')
+                resume_data = self.test_resumer.resume_test(laptop_id, self._config_hash())
             else:
                 if self.test_resumer.prompt_resume(incomplete_test):
-                    log_debug("User chose to resume test", 'info')
-                    resume_data = self.test_resumer.resume_test(laptop_id)
+                    log_debug("User chose to resume test", level='info')
+                    resume_data = self.test_resumer.resume_test(laptop_id, self._config_hash())
                 else:
-                    log_debug("User chose not to resume, archiving incomplete test", 'info')
+                    log_debug("User chose not to resume, archiving incomplete test", level='info')
                     self.test_resumer.archive_incomplete_test(laptop_id)
         else:
-            log_debug("No incomplete test found", 'info')
+            log_debug("No incomplete test found", level='info')
         
         # Run validation
         if args.validate:
-            log_debug("Running validation only (--validate flag)", 'info')
+            log_debug("Running validation only (--validate flag)", level='info')
             is_valid = self.run_validation(laptop_id, interactive=False)
             if not is_valid:
                 print("\nValidation failed. Please fix errors and try again.")
             return
         
         if not resume_data and not self.skip_validation:
-            log_debug("Running pre-test validation", 'info')
+            log_debug("Running pre-test validation", level='info')
             if not self.run_validation(laptop_id, interactive=False):
                 print("\n" + "=" * 70)
                 print("VALIDATION FAILED")
@@ -912,21 +1232,21 @@ Examples:
                 print("\nTip: Use --skip-validation to bypass (not recommended)")
                 return
         elif self.skip_validation:
-            log_debug("Validation skipped (--skip-validation flag)", 'warning')
+            log_debug("Validation skipped (--skip-validation flag)", level='warning')
             print("\n⚠️  Warning: Validation skipped. Test may not be accurate.")
         
         # Start test
         try:
-            log_debug(f"Starting test for laptop: {laptop_id}", 'info')
+            log_debug("Starting test for laptop: %s", laptop_id, level='info')
             if resume_data:
-                log_debug(f"Resuming test with data: {resume_data}", 'info')
+                log_debug("Resuming test with data: %s", resume_data, level='info')
             self.start_test(laptop_id, resume_data, auto_start=args.auto_start)
         except KeyboardInterrupt:
-            log_debug("Test interrupted by user (KeyboardInterrupt)", 'warning')
+            log_debug("Test interrupted by user (KeyboardInterrupt)", level='warning')
             print("\n\n⚠️  Test interrupted by user")
         except Exception as e:
-            log_debug(f"Error during test: {e}", 'error')
-            log_debug("Exception traceback:", 'exception')
+            log_debug("Error during test: %s", e, level='error')
+            log_debug("Exception traceback:", level='exception')
             print(f"\n❌ Error during test: {e}")
             traceback.print_exc()
 
@@ -937,88 +1257,101 @@ def _battery_bar(percent, width=20):
     return '█' * filled + '░' * (width - filled)
 
 
+# How long the exit prompt keeps a Windows console open when nobody presses Enter
+EXIT_PAUSE_TIMEOUT = 60
+
+
+def _pause(prompt, timeout=None):
+    """
+    Wait for Enter. Returns False if interrupted (Ctrl+C / end of input).
+    With a timeout, a Windows console polls the keyboard (msvcrt) and gives
+    up after timeout seconds, so unattended runs don't hang; otherwise this
+    is a plain input().
+    """
+    if timeout is not None and sys.platform == 'win32' and sys.stdin is not None and sys.stdin.isatty():
+        import msvcrt
+        print(prompt, end='', flush=True)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not msvcrt.kbhit():
+                time.sleep(0.05)
+                continue
+            key = msvcrt.getwch()
+            if key == '\x03':
+                print()
+                return False
+            if key in ('\r', '\n'):
+                break
+        print()
+        return True
+    try:
+        input(prompt)
+        return True
+    except (KeyboardInterrupt, EOFError):
+        return False
+
+
 def pause_before_exit():
     """Pause before exiting so user can see error messages"""
-    if sys.platform == 'win32':
-        try:
-            input("\n\nPress Enter to exit...")
-        except (KeyboardInterrupt, EOFError):
-            time.sleep(5)
-    else:
-        try:
-            input("\n\nPress Enter to exit...")
-        except (KeyboardInterrupt, EOFError):
-            pass
+    _pause("\n\nPress Enter to exit...", timeout=EXIT_PAUSE_TIMEOUT)
+
+
+_SEP = "=" * 70
+_MENU_HEADER = "\n" + _SEP + "\nWINDOWS LAPTOP BATTERY TESTER"
+_MENU_ITEMS = "\n".join([
+    _SEP,
+    "\nMain Menu:",
+    "  1. Start New Battery Test",
+    "  2. Auto-Start (wait for battery power)",
+    "  3. Quick Test (30 min estimate)",
+    "  4. Battery Calibration",
+    "  5. Resume Interrupted Test",
+    "  6. View Test Results",
+    "  7. Generate Report",
+    "  8. Run Validation Checks",
+    "  9. View All Laptops Summary",
+    "  0. Compare All Laptops",
+    "  C. Show Config",
+])
+# Key typed at the menu prompt -> action name handled in main()
+_MENU_CHOICES = {
+    '1': 'start_test',
+    '2': 'auto_start',
+    '3': 'quick_test',
+    '4': 'calibration',
+    '5': 'resume',
+    '6': 'view_results',
+    '7': 'report',
+    '8': 'validate',
+    '9': 'list',
+    '0': 'compare',
+    'c': 'config',
+    'd': 'enable_debug',
+    'x': 'exit',
+}
+_MENU_CHOICES_DEBUG = dict(_MENU_CHOICES, d='disable_debug')
+_MENU_BODY = "\n" + "\n".join([_MENU_ITEMS, "  D. Enable Debug Mode", "  X. Exit", "\n" + _SEP]) + "\n"
+_MENU_BODY_DEBUG = "\n" + "\n".join([_MENU_ITEMS, "  D. Disable Debug Mode", "  X. Exit", "\n" + _SEP]) + "\n"
 
 
 def show_main_menu():
     """Display interactive main menu"""
-    print("\n" + "=" * 70)
-    print("WINDOWS LAPTOP BATTERY TESTER")
-    if DEBUG_MODE:
-        print("  [DEBUG MODE ENABLED]")
-        if debug_logger:
-            # Get the log file path from the handler
-            log_file = None
-            for handler in debug_logger.handlers:
-                if isinstance(handler, logging.FileHandler):
-                    log_file = handler.baseFilename
-                    break
-            if log_file:
-                print(f"  Log: {os.path.basename(log_file)}")
-    print("=" * 70)
-    print("\nMain Menu:")
-    print("  1. Start New Battery Test")
-    print("  2. Auto-Start (wait for battery power)")
-    print("  3. Quick Test (30 min estimate)")
-    print("  4. Battery Calibration")
-    print("  5. Resume Interrupted Test")
-    print("  6. View Test Results")
-    print("  7. Generate Report")
-    print("  8. Run Validation Checks")
-    print("  9. View All Laptops Summary")
-    print("  0. Compare All Laptops")
-    print("  C. Show Config")
+    header = _MENU_HEADER
     if DEBUG_MODE:
-        print("  D. Disable Debug Mode")
-        print("  X. Exit")
-    else:
-        print("  D. Enable Debug Mode")
-        print("  X. Exit")
-    print("\n" + "=" * 70)
+        header += "\n  [DEBUG MODE ENABLED]"
+        if debug_log_name:
+            header += f"\n  Log: {debug_log_name}"
+    # One write per render rather than a print per line
+    sys.stdout.write(header + (_MENU_BODY_DEBUG if DEBUG_MODE else _MENU_BODY))
+    sys.stdout.flush()
     
+    choices = _MENU_CHOICES_DEBUG if DEBUG_MODE else _MENU_CHOICES
     while True:
         try:
-            choice = input("\nSelect an option: ").strip().lower()
-
-            if choice == '1':
-                return 'start_test'
-            elif choice == '2':
-                return 'auto_start'
-            elif choice == '3':
-                return 'quick_test'
-            elif choice == '4':
-                return 'calibration'
-            elif choice == '5':
-                return 'resume'
-            elif choice == '6':
-                return 'view_results'
-            elif choice == '7':
-                return 'report'
-            elif choice == '8':
-                return 'validate'
-            elif choice == '9':
-                return 'list'
-            elif choice == '0':
-                return 'compare'
-            elif choice == 'c':
-                return 'config'
-            elif choice == 'd':
-                return 'disable_debug' if DEBUG_MODE else 'enable_debug'
-            elif choice == 'x':
-                return 'exit'
-            else:
-                print("Invalid choice.")
+            action = choices.get(input("\nSelect an option: ").strip().lower())
+            if action:
+                return action
+            print("Invalid choice.")
         except KeyboardInterrupt:
             print("\n\nExiting...")
             return 'exit'
@@ -1026,143 +1359,113 @@ def show_main_menu():
             return 'exit'
 
 
+def _menu_start_test(tester, preset=None, auto_start=False, note=None):
+    """Start a test from the interactive menu, optionally with a preset"""
+    tester.selected_preset = preset
+    if preset:
+        tester.low_battery_threshold = PRESETS[preset]['low_battery_threshold']
+    if note:
+        print(f"\n{note}")
+    tester._run_start_test_interactive(auto_start=auto_start)
+
+
 def main():
     """Main entry point"""
+    global debug_logger, DEBUG_MODE
+    # Answer --version before any data file or hardware setup
+    if sys.argv[1:] == ['--version']:
+        print(VERSION_STRING)
+        return
     try:
         # Check for debug flag early
         if '--debug' in sys.argv:
             setup_debug_logging()
-            log_debug("Application started", 'info')
-            log_debug(f"Command line: {sys.argv}", 'debug')
+            log_debug("Application started", level='info')
+            log_debug("Command line: %s", sys.argv, level='debug')
         
         tester = BatteryTester()
         
         # Check if any command-line arguments were provided
         if len(sys.argv) > 1:
-            log_debug("Running in command-line mode", 'info')
+            log_debug("Running in command-line mode", level='info')
             # Run with command-line arguments (existing behavior)
             try:
                 tester.run()
-                log_debug("Command-line execution completed", 'info')
+                log_debug("Command-line execution completed", level='info')
             except KeyboardInterrupt:
-                log_debug("Operation cancelled by user", 'warning')
+                log_debug("Operation cancelled by user", level='warning')
                 print("\n\nOperation cancelled.")
             except Exception as e:
-                log_debug(f"Error in command-line mode: {e}", 'error')
-                log_debug("Exception traceback:", 'exception')
+                log_debug("Error in command-line mode: %s", e, level='error')
+                log_debug("Exception traceback:", level='exception')
                 print(f"\n❌ Error: {e}")
                 traceback.print_exc()
             # For command-line mode, pause before exit
             pause_before_exit()
         else:
-            log_debug("Running in interactive menu mode", 'info')
+            log_debug("Running in interactive menu mode", level='info')
+            # choice -> (label for the debug log, handler)
+            menu_actions = {
+                'start_test': ("Start New Battery Test",
+                               lambda: _menu_start_test(tester, auto_start=False)),
+                'auto_start': ("Auto-Start", lambda: _menu_start_test(tester, auto_start=True)),
+                'quick_test': ("Quick Test", lambda: _menu_start_test(
+                    tester, 'quick_test',
+                    note="Quick Test: runs for 30 min, estimates full runtime from discharge rate.")),
+                'calibration': ("Battery Calibration", lambda: _menu_start_test(
+                    tester, 'battery_calibration',
+                    note="Battery Calibration: full discharge required. Connect AC when prompted.")),
+                'resume': ("Resume Interrupted Test", tester._run_resume_interactive),
+                'view_results': ("View Test Results", tester._run_view_results_interactive),
+                'report': ("Generate Report", tester._run_report_interactive),
+                'validate': ("Run Validation Checks", tester._run_validate_interactive),
+                'list': ("View All Laptops Summary", tester.handle_list_command),
+                'compare': ("Compare All Laptops", lambda: tester.handle_compare_command(sort_by='runtime')),
+            }
             # Show interactive menu
             while True:
-                log_debug("Showing main menu", 'debug')
                 choice = show_main_menu()
-                log_debug(f"User selected menu option: {choice}", 'info')
+                log_debug("User selected menu option: %s", choice, level='info')
                 
                 if choice == 'exit':
-                    log_debug("User chose to exit", 'info')
                     print("\nGoodbye!")
                     pause_before_exit()
                     break
                 elif choice == 'enable_debug':
                     if not DEBUG_MODE:
                         setup_debug_logging()
-                        log_file = None
-                        for handler in debug_logger.handlers:
-                            if isinstance(handler, logging.FileHandler):
-                                log_file = handler.baseFilename
-                                break
+                        log_file = debug_log_file
                         print("\n" + "=" * 70)
                         print("✓ DEBUG MODE ENABLED")
                         print("=" * 70)
                         if log_file:
-                            print(f"\nLog file: {os.path.abspath(log_file)}")
+                            print(f"\nLog file: {log_file}")
                         print("\nAll operations will now be logged to the file above.")
                         print("You can share this log file for troubleshooting.")
-                        input("\nPress Enter to return to main menu...")
+                        _pause("\nPress Enter to return to main menu...")
                     else:
                         print("\nDebug mode is already enabled.")
-                        input("\nPress Enter to continue...")
+                        _pause("\nPress Enter to continue...")
                 elif choice == 'disable_debug':
                     if DEBUG_MODE:
-                        global debug_logger, DEBUG_MODE
-                        log_file = None
-                        if debug_logger:
-                            for handler in debug_logger.handlers:
-                                if isinstance(handler, logging.FileHandler):
-                                    log_file = handler.baseFilename
-                                    break
-                            
-                            # Close log file handlers
-                            for handler in debug_logger.handlers[:]:
-                                handler.close()
-                                debug_logger.removeHandler(handler)
-                        
-                        # Reset globals
-                        debug_logger = None
-                        DEBUG_MODE = False
+                        log_file, log_name = debug_log_file, debug_log_name
+                        # Flush and close log file handlers, reset globals
+                        shutdown_debug_logging()
                         
-                        log_debug("Debug mode disabled by user", 'info')  # This won't log since we just disabled it
+                        log_debug("Debug mode disabled by user", level='info')  # This won't log since we just disabled it
                         
                         print("\n" + "=" * 70)
                         print("✓ DEBUG MODE DISABLED")
                         print("=" * 70)
                         if log_file:
-                            print(f"\nLast log file: {os.path.basename(log_file)}")
-                            print(f"Full path: {os.path.abspath(log_file)}")
+                            print(f"\nLast log file: {log_name}")
+                            print(f"Full path: {log_file}")
                         print("\nDebug logging has been stopped.")
                         print("You can re-enable it anytime from the menu.")
-                        input("\nPress Enter to return to main menu...")
+                        _pause("\nPress Enter to return to main menu...")
                     else:
                         print("\nDebug mode is not enabled.")
-                        input("\nPress Enter to continue...")
-                elif choice == 'start_test':
-                    log_debug("User selected: Start New Battery Test", 'info')
-                    tester.selected_preset = None
-                    try:
-                        tester._run_start_test_interactive(auto_start=False)
-                    except KeyboardInterrupt:
-                        print("\n\nOperation cancelled.")
-                    except Exception as e:
-                        print(f"\n❌ Error: {e}")
-                        traceback.print_exc()
-                elif choice == 'auto_start':
-                    log_debug("User selected: Auto-Start", 'info')
-                    tester.selected_preset = None
-                    try:
-                        tester._run_start_test_interactive(auto_start=True)
-                    except KeyboardInterrupt:
-                        print("\n\nOperation cancelled.")
-                    except Exception as e:
-                        print(f"\n❌ Error: {e}")
-                        traceback.print_exc()
-                elif choice == 'quick_test':
-                    log_debug("User selected: Quick Test", 'info')
-                    tester.selected_preset = 'quick_test'
-                    tester.low_battery_threshold = PRESETS['quick_test']['low_battery_threshold']
-                    print(f"\nQuick Test: runs for 30 min, estimates full runtime from discharge rate.")
-                    try:
-                        tester._run_start_test_interactive()
-                    except KeyboardInterrupt:
-                        print("\n\nOperation cancelled.")
-                    except Exception as e:
-                        print(f"\n❌ Error: {e}")
-                        traceback.print_exc()
-                elif choice == 'calibration':
-                    log_debug("User selected: Battery Calibration", 'info')
-                    tester.selected_preset = 'battery_calibration'
-                    tester.low_battery_threshold = PRESETS['battery_calibration']['low_battery_threshold']
-                    print(f"\nBattery Calibration: full discharge required. Connect AC when prompted.")
-                    try:
-                        tester._run_start_test_interactive()
-                    except KeyboardInterrupt:
-                        print("\n\nOperation cancelled.")
-                    except Exception as e:
-                        print(f"\n❌ Error: {e}")
-                        traceback.print_exc()
+                        _pause("\nPress Enter to continue...")
                 elif choice == 'config':
                     tester.config.show()
                     try:
@@ -1185,108 +1488,50 @@ def main():
                         print(f"\n❌ Error: {e}")
                         traceback.print_exc()
                     # Return to menu automatically
-                elif choice == 'resume':
-                    log_debug("User selected: Resume Interrupted Test", 'info')
-                    try:
-                        tester._run_resume_interactive()
-                    except KeyboardInterrupt:
-                        log_debug("Resume operation cancelled", 'warning')
-                        print("\n\nOperation cancelled.")
-                    except Exception as e:
-                        log_debug(f"Error in resume: {e}", 'error')
-                        log_debug("Exception traceback:", 'exception')
-                        print(f"\n❌ Error: {e}")
-                        traceback.print_exc()
-                    # Return to menu automatically
-                elif choice == 'view_results':
-                    log_debug("User selected: View Test Results", 'info')
-                    try:
-                        tester._run_view_results_interactive()
-                    except KeyboardInterrupt:
-                        log_debug("View results operation cancelled", 'warning')
-                        print("\n\nOperation cancelled.")
-                    except Exception as e:
-                        log_debug(f"Error viewing results: {e}", 'error')
-                        log_debug("Exception traceback:", 'exception')
-                        print(f"\n❌ Error: {e}")
-                        traceback.print_exc()
-                    # Return to menu automatically
-                elif choice == 'report':
-                    log_debug("User selected: Generate Report", 'info')
-                    try:
-                        tester._run_report_interactive()
-                    except KeyboardInterrupt:
-                        log_debug("Report generation cancelled", 'warning')
-                        print("\n\nOperation cancelled.")
-                    except Exception as e:
-                        log_debug(f"Error generating report: {e}", 'error')
-                        log_debug("Exception traceback:", 'exception')
-                        print(f"\n❌ Error: {e}")
-                        traceback.print_exc()
-                    # Return to menu automatically
-                elif choice == 'validate':
-                    log_debug("User selected: Run Validation Checks", 'info')
-                    try:
-                        tester._run_validate_interactive()
-                    except KeyboardInterrupt:
-                        log_debug("Validation operation cancelled", 'warning')
-                        print("\n\nOperation cancelled.")
-                    except Exception as e:
-                        log_debug(f"Error in validation: {e}", 'error')
-                        log_debug("Exception traceback:", 'exception')
-                        print(f"\n❌ Error: {e}")
-                        traceback.print_exc()
-                    # Return to menu automatically
-                elif choice == 'list':
-                    log_debug("User selected: View All Laptops Summary", 'info')
-                    try:
-                        tester.handle_list_command()
-                    except Exception as e:
-                        log_debug(f"Error listing laptops: {e}", 'error')
-                        log_debug("Exception traceback:", 'exception')
-                        print(f"\n❌ Error: {e}")
-                        traceback.print_exc()
-                    # Return to menu automatically
-                elif choice == 'compare':
-                    log_debug("User selected: Compare All Laptops", 'info')
-                    try:
-                        tester.handle_compare_command(sort_by='runtime')
-                    except Exception as e:
-                        log_debug(f"Error comparing laptops: {e}", 'error')
-                        log_debug("Exception traceback:", 'exception')
-                        print(f"\n❌ Error: {e}")
-                        traceback.print_exc()
+                else:
+                    action = menu_actions.get(choice)
+                    if action:
+                        label, handler = action
+                        try:
+                            handler()
+                        except KeyboardInterrupt:
+                            log_debug("%s cancelled", label, level='warning')
+                            print("\n\nOperation cancelled.")
+                        except Exception as e:
+                            log_debug("Error in %s: %s", label, e, level='error')
+                            log_debug("Exception traceback:", level='exception')
+                            print(f"\n❌ Error: {e}")
+                            traceback.print_exc()
                     # Return to menu automatically
                 
                 # Automatically return to menu (except for exit)
                 if choice != 'exit':
-                    try:
-                        input("\n\nPress Enter to return to main menu...")
-                    except (KeyboardInterrupt, EOFError):
+                    if not _pause("\n\nPress Enter to return to main menu..."):
                         # If interrupted, ask if they want to exit
                         try:
                             exit_choice = input("\nExit? (y/n): ").strip().lower()
-                            if exit_choice == 'y':
-                                print("\nGoodbye!")
-                                pause_before_exit()
-                                break
-                        except:
+                        except (KeyboardInterrupt, EOFError):
+                            break
+                        if exit_choice == 'y':
+                            print("\nGoodbye!")
+                            pause_before_exit()
                             break
         
     except KeyboardInterrupt:
-        log_debug("Application interrupted by user", 'warning')
+        log_debug("Application interrupted by user", level='warning')
         print("\n\nExiting...")
     except Exception as e:
-        log_debug(f"Fatal error: {e}", 'critical')
-        log_debug("Fatal exception traceback:", 'exception')
+        log_debug("Fatal error: %s", e, level='critical')
+        log_debug("Fatal exception traceback:", level='exception')
         print(f"\n❌ Fatal error: {e}")
         traceback.print_exc()
         pause_before_exit()
         sys.exit(1)
     finally:
         if DEBUG_MODE:
-            log_debug("Application shutting down", 'info')
-            log_debug("=" * 70, 'info')
+            log_debug("Application shutting down", level='info')
+            log_debug("=" * 70, level='info')
+            shutdown_debug_logging()
 
 
 if __name__ == '__main__':
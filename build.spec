@@ -35,6 +35,7 @@ a = Analysis(
         'win32com.shell',
         'pythoncom',
         'pywintypes',
+        'orjson',
         'hardware_info',
         'battery_monitor',
         'battery_health',
@@ -51,6 +52,7 @@ a = Analysis(
         'test_config',
         'discharge_analyzer',
         'power_event_logger',
+        'wmi_connection',
     ] + psutil_hiddenimports + pil_hiddenimports,
     hookspath=[],
     hooksconfig={},
@@ -2,8 +2,10 @@
 Charging Detection Module
 Monitors AC power connection during test with a grace period for accidental reconnects.
 """
+import threading
 import time
-from datetime import datetime
+from collections import deque
+from data_logger import now_iso
 
 try:
     from battery_monitor import BatteryMonitor
@@ -19,34 +21,53 @@ class ChargingMonitor:
     full grace period.
     """
 
-    def __init__(self, grace_period=30):
+    def __init__(self, grace_period=30, on_change=None, max_events=1000):
+        """
+        on_change: optional callable(state) run when the test pauses or resumes
+        max_events: how many undrained charging events to keep (oldest dropped)
+        """
         if BatteryMonitor is None:
             raise ImportError("BatteryMonitor not available")
         self.battery_monitor = BatteryMonitor()
-        self.charging_events = []
+        # Appended by the polling thread, emptied by drain_events()
+        self.charging_events = deque(maxlen=max_events)
         self.is_paused = False
-        self.pause_start_time = None
+        self.pause_start_time = None      # time.monotonic() when the test paused
         self.total_charging_time = 0
         self.grace_period = grace_period
         self._grace_start = None          # When charging was first detected
         self._grace_warning_shown = False
+        self.on_change = on_change
+        # Stops monitor() when no stop_event is passed in
+        self.stop_event = threading.Event()
 
-    def check_charging_status(self):
-        """Check if charger is currently connected."""
-        status = self.battery_monitor.get_battery_status()
+    def check_charging_status(self, status=None):
+        """Check if charger is currently connected.
+
+        status: a dict already fetched from BatteryMonitor.get_battery_status();
+        when given, no new battery query is made.
+        """
+        if status is None:
+            status = self.battery_monitor.get_battery_status()
         return status['ac_connected'] or status['charging']
 
-    def update(self):
+    def update(self, status=None, now=None):
         """
         Poll charging state with grace period.
+        status: optional pre-fetched battery status (see check_charging_status)
+        now: optional time.monotonic() reading shared with the caller's loop
         Returns one of: 'ok', 'grace', 'paused', 'resumed', 'charging', None
         """
-        charging = self.check_charging_status()
+        if status is None:
+            status = self.battery_monitor.get_battery_status()
+        charging = self.check_charging_status(status)
+        if now is None:
+            now = time.monotonic()
 
         # Already paused — check if still charging
         if self.is_paused:
             if not charging:
-                return self._handle_charging_stopped()
+                return self._handle_charging_stopped(now, status)
             return 'paused'
 
         # Not paused, no charging detected — all good
@@ -56,7 +77,6 @@ class ChargingMonitor:
             return 'ok'
 
         # Charging detected — start or continue grace period
-        now = time.time()
         if self._grace_start is None:
             self._grace_start = now
             self._grace_warning_shown = False
@@ -70,32 +90,40 @@ class ChargingMonitor:
             return 'grace'
 
         # Grace period expired — pause the test
-        return self._handle_charging_detected()
+        return self._handle_charging_detected(now, status)
 
-    def _handle_charging_detected(self):
+    def _handle_charging_detected(self, now=None, status=None):
+        """status: battery status from the same poll, reused for the event record"""
         self.is_paused = True
-        self.pause_start_time = time.time()
+        self.pause_start_time = time.monotonic() if now is None else now
         self._grace_start = None
         self._grace_warning_shown = False
 
-        status = self.battery_monitor.get_battery_status()
+        if status is None:
+            status = self.battery_monitor.get_battery_status()
         event = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso(),
             'event': 'charging_detected',
             'ac_connected': True,
             'battery_percent': status['percentage'],
         }
         self.charging_events.append(event)
+        if self.on_change:
+            self.on_change('paused')
         return 'paused'
 
-    def _handle_charging_stopped(self):
+    def _handle_charging_stopped(self, now=None, status=None):
+        """status: battery status from the same poll, reused for the event record"""
         if self.is_paused:
-            pause_duration = time.time() - self.pause_start_time
+            if now is None:
+                now = time.monotonic()
+            pause_duration = now - self.pause_start_time
             self.total_charging_time += pause_duration
 
-            status = self.battery_monitor.get_battery_status()
+            if status is None:
+                status = self.battery_monitor.get_battery_status()
             event = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now_iso(),
                 'event': 'charging_stopped',
                 'ac_connected': False,
                 'pause_duration_seconds': pause_duration,
@@ -106,32 +134,62 @@ class ChargingMonitor:
         self.is_paused = False
         self.pause_start_time = None
         self._grace_start = None
+        if self.on_change:
+            self.on_change('resumed')
         return 'resumed'
 
     @property
     def grace_remaining(self):
         """Seconds remaining in grace period, or 0."""
+        return self.get_grace_remaining()
+
+    def get_grace_remaining(self, now=None):
+        """Seconds remaining in grace period at monotonic time now, or 0."""
         if self._grace_start is None or self.is_paused:
             return 0
-        elapsed = time.time() - self._grace_start
-        return max(0, int(self.grace_period - elapsed))
+        if now is None:
+            now = time.monotonic()
+        return max(0, int(self.grace_period - (now - self._grace_start)))
+
+    def drain_events(self):
+        """Remove and return the charging events recorded since the last drain"""
+        events = []
+        while True:
+            try:
+                events.append(self.charging_events.popleft())
+            except IndexError:
+                return events
 
     def get_total_charging_time(self):
         return self.total_charging_time
 
     # --- threaded monitor (alternative API, used by __main__ test block) ---
-    def monitor(self, stop_event=None):
+    def monitor(self, stop_event=None, min_interval=1.0, max_interval=30.0):
+        """
+        Poll until stop_event (default: self.stop_event) is set.
+        The poll interval starts at 5 s, grows 1.5x per unchanged poll up to
+        max_interval, and drops to min_interval after a charging transition.
+        """
+        if stop_event is None:
+            stop_event = self.stop_event
         last_charging_state = False
+        interval = 5.0
         while True:
-            if stop_event and stop_event.is_set():
-                break
-            current_charging = self.check_charging_status()
+            # One battery query per pass, shared with the event handlers
+            status = self.battery_monitor.get_battery_status()
+            current_charging = self.check_charging_status(status)
             if current_charging and not last_charging_state:
-                self._handle_charging_detected()
+                self._handle_charging_detected(status=status)
             elif not current_charging and last_charging_state:
-                self._handle_charging_stopped()
+                self._handle_charging_stopped(status=status)
+            if current_charging == last_charging_state:
+                interval = min(interval * 1.5, max_interval)
+            else:
+                interval = min_interval
             last_charging_state = current_charging
-            time.sleep(5)
+            # Returns at once when stopped instead of sleeping out the interval
+            if stop_event.wait(interval):
+                break
         return self.charging_events
 
 
@@ -139,7 +197,6 @@ if __name__ == '__main__':
     monitor = ChargingMonitor(grace_period=10)
     print("Charging Monitor Test (10s grace):")
     print("=" * 50)
-    import threading
     stop_event = threading.Event()
     thread = threading.Thread(target=monitor.monitor, args=(stop_event,), daemon=True)
     thread.start()
@@ -2,62 +2,399 @@
 Data Logging Module
 Handles JSON persistence with multi-laptop support
 """
+import hashlib
 import json
 import os
+import threading
+import time
+from collections import deque
 from datetime import datetime
 from backup_manager import BackupManager
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+DATA_VERSION = '2.0'
+# Run statuses that count as a finished test for reports and comparisons
+COMPLETED_STATUSES = ('completed', 'low_battery_shutdown')
+# test_run['entries'] holds one list per field, index i of each being entry i
+# (data_version 1.0 stored a list of dicts, converted on load)
+ENTRY_FIELDS = ('timestamp', 'battery_percent', 'elapsed_seconds', 'charging')
+
+
+def _new_entries():
+    return {field: [] for field in ENTRY_FIELDS}
+
+
+def _append_entry(entries, entry):
+    """Append an entry dict to the entry columns"""
+    for field in ENTRY_FIELDS:
+        entries[field].append(entry.get(field))
+
+
+def _migrate_data(data):
+    """Convert data_version 1.0 entry lists to columns, in place"""
+    for laptop in data.get('laptops', {}).values():
+        for run in laptop.get('test_runs', ()):
+            entries = run.get('entries')
+            if isinstance(entries, list):
+                run['entries'] = _new_entries()
+                for entry in entries:
+                    _append_entry(run['entries'], entry)
+    data['data_version'] = DATA_VERSION
+
+
+def _dumps(data, pretty=False):
+    """
+    Encode data as UTF-8 JSON bytes, using orjson when available
+    pretty: indent for human readers; compact output is about half the size
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(data, option=option)
+        except TypeError:
+            # A value orjson can't encode (e.g. from a WMI property): use json below
+            pass
+    if pretty:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _atomic_write(path, data_bytes, lock=None, sync_dir=True):
+    """
+    Durably replace path with data_bytes: write a temp file, fsync it, rename
+    it over path (holding lock, if given), then fsync the directory so the
+    rename itself survives a crash. Windows can't open directories for fsync,
+    so that last step only runs on POSIX.
+    """
+    temp_file = path + '.tmp'
+    with open(temp_file, 'wb') as f:
+        f.write(data_bytes)
+        f.flush()
+        os.fsync(f.fileno())
+    if lock is not None:
+        with lock:
+            os.replace(temp_file, path)
+    else:
+        os.replace(temp_file, path)
+    if sync_dir and os.name != 'nt':
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def now_iso():
+    """Local time as an ISO 8601 string, to the millisecond; used for every logged timestamp"""
+    return datetime.now().isoformat(timespec='milliseconds')
+
+
+def config_hash(settings):
+    """Stable hash of the test settings a run was started with"""
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
 
 class DataLogger:
     """Handle data persistence for battery tests"""
 
-    def __init__(self, data_file='battery_test_data.json'):
+    def __init__(self, data_file='battery_test_data.json', flush_every=20, flush_interval=300,
+                 flush_below_percent=10, durable_dir=True, journal_sync_interval=5):
         self.data_file = data_file
+        # Also fsync the directory after each atomic rename (see _atomic_write)
+        self.durable_dir = durable_dir
+        self.checkpoint_file = os.path.splitext(data_file)[0] + '_checkpoint.json'
+        # Append-only log of entries not yet in the data file; one short line
+        # per entry instead of rewriting the whole JSON document
+        self.journal_file = os.path.splitext(data_file)[0] + '_journal.jsonl'
+        self._journal = None
+        # Journal lines are queued by the logging calls and written behind by a
+        # flusher thread, one write and one fsync per journal_sync_interval
+        self.journal_sync_interval = journal_sync_interval
+        self._journal_pending = deque()
+        self._journal_lock = threading.RLock()
+        self._flusher = None
+        self._flusher_stop = threading.Event()
+        # Only the process running a test may clear the journal; others (the
+        # results and report commands) just read it, see _claim_journal
+        self._owns_journal = False
         self.backup_manager = BackupManager(data_file)
         self.data = self._load_data()
         self._last_log_time: dict = {}
         self._last_log_percentage: dict = {}
+        # laptop_id -> its in-progress test run, so the logging calls skip the lookup
+        self._current_run_by_laptop: dict = {}
+        # laptop_id -> its most recent completed run (see get_latest_completed_run)
+        self._latest_completed_run: dict = {}
+        # Entries and events are kept in memory and written in batches: after
+        # flush_every unsaved records or flush_interval seconds, whichever comes first.
+        # Below flush_below_percent every entry is written, as the laptop may
+        # power off at any moment.
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.flush_below_percent = flush_below_percent
+        self._unsaved_entries = 0
+        self._last_flush_monotonic = time.monotonic()
+        self._saving = False  # guards against re-entry from signal handlers
+        
+        # Entries journaled but not yet saved, by a run that crashed or is
+        # still going in another process. Merged in memory only; they are
+        # saved once this process starts or resumes a run (_claim_journal)
+        self._journal_restored = self._replay_journal()
     
     def _load_data(self):
         """Load data from JSON file or create new structure"""
         if os.path.exists(self.data_file):
+            data = None
             try:
-                is_valid, result = self.backup_manager.validate_json(self.data_file)
-                if is_valid:
-                    return result
-                else:
-                    print(f"Warning: Data file is corrupted: {result}")
-                    print("Attempting recovery from backup...")
-                    success, message = self.backup_manager.recover_from_backup()
-                    if success:
-                        print(f"✓ {message}")
-                        return self._load_data()
-                    else:
-                        print(f"Recovery failed: {message}")
-                        print("Creating new data file...")
+                # Parsed once, whether from the data file or a restored backup
+                data = self.backup_manager.parse_or_recover()
             except Exception as e:
                 print(f"Error loading data file: {e}")
-                print("Creating new data file...")
+            if data is not None:
+                version = data.get('data_version')
+                if version in (None, '1.0'):
+                    _migrate_data(data)
+                elif version != DATA_VERSION:
+                    # Written by a newer version; saving would relabel it as ours
+                    raise ValueError(
+                        f"{self.data_file} has data_version {version}, newer than the "
+                        f"supported {DATA_VERSION}. Please update the battery tester."
+                    )
+                return data
+            print("Creating new data file...")
         
         # Create new data structure
         return {
-            'data_version': '1.0',
+            'data_version': DATA_VERSION,
             'current_laptop_id': None,
             'script_version': '1.0.0',
             'laptops': {}
         }
     
-    def _save_data(self):
-        """Save data to JSON file atomically"""
+    def _save_data(self, pretty=False):
+        """
+        Save data to JSON file atomically
+        pretty: write indented JSON; only the final write of a run uses it, the
+                frequent in-progress saves are compact
+        """
+        self._saving = True
         try:
-            temp_file = self.data_file + '.tmp'
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
-            os.replace(temp_file, self.data_file)
+            # Encode in memory, then write the whole document in one call.
+            # A backup may be copying the data file on the worker thread, so
+            # the rename happens under its lock
+            _atomic_write(self.data_file, _dumps(self.data, pretty),
+                          lock=self.backup_manager.file_lock, sync_dir=self.durable_dir)
+            # Everything journaled is in the data file now
+            if self._owns_journal:
+                self._clear_journal()
+            self._unsaved_entries = 0
+            self._last_flush_monotonic = time.monotonic()
             return True
         except Exception as e:
             print(f"Error saving data: {e}")
             return False
+        finally:
+            self._saving = False
+    
+    def _append_journal(self, laptop_id, run_id, entry, kind='entry'):
+        """
+        Queue one record for the journal (written by the flusher thread)
+        kind: 'entry', or the run list an event belongs to ('power_events',
+              'low_battery_events')
+        """
+        self._journal_pending.append(json.dumps({'laptop_id': laptop_id, 'run_id': run_id, kind: entry}) + '\n')
+        if self._flusher is None:
+            # Writing the journal makes this process the one that clears it
+            self._claim_journal()
+            self._flusher_stop.clear()
+            self._flusher = threading.Thread(target=self._flush_loop, name='journal-flusher', daemon=True)
+            self._flusher.start()
+    
+    def _flush_loop(self):
+        """Flusher thread: write queued journal records every journal_sync_interval"""
+        while not self._flusher_stop.wait(self.journal_sync_interval):
+            self._write_journal()
+    
+    def _write_journal(self):
+        """Write all queued journal records in one call and fsync them once"""
+        with self._journal_lock:
+            lines = []
+            while True:
+                try:
+                    lines.append(self._journal_pending.popleft())
+                except IndexError:
+                    break
+            if not lines:
+                return
+            try:
+                if self._journal is not None and not self._journal_is_current():
+                    self._journal.close()
+                    self._journal = None
+                if self._journal is None:
+                    self._journal = open(self.journal_file, 'a', encoding='utf-8')
+                self._journal.write(''.join(lines))
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+            except Exception as e:
+                print(f"Warning: Could not write entry journal: {e}")
+    
+    def _journal_is_current(self):
+        """Whether the open journal handle is still the file at journal_file"""
+        try:
+            return os.path.samestat(os.fstat(self._journal.fileno()), os.stat(self.journal_file))
+        except OSError:
+            # Removed or replaced since it was opened
+            return False
+    
+    def _save_if_due(self, battery_percent=None):
+        """Save once enough unsaved records, time or battery drain call for it"""
+        if (self._unsaved_entries >= self.flush_every
+                or (battery_percent is not None and battery_percent <= self.flush_below_percent)
+                or time.monotonic() - self._last_flush_monotonic >= self.flush_interval):
+            self._save_data()
+    
+    def _add_run_event(self, laptop_id, test_run, kind, event):
+        """Journal an event into test_run[kind]; the data file is rewritten in batches"""
+        test_run[kind].append(event)
+        self._append_journal(laptop_id, test_run['run_id'], event, kind)
+        self._unsaved_entries += 1
+    
+    def _clear_journal(self):
+        """Empty the journal once its entries have been saved to the data file"""
+        with self._journal_lock:
+            # Records still queued are in the data file as well
+            self._journal_pending.clear()
+            try:
+                if self._journal is not None:
+                    self._journal.seek(0)
+                    self._journal.truncate()
+                elif os.path.exists(self.journal_file):
+                    os.remove(self.journal_file)
+            except Exception as e:
+                print(f"Warning: Could not clear entry journal: {e}")
+    
+    def _claim_journal(self):
+        """
+        Take over the journal for a run this process starts, resumes or ends:
+        from here on each save clears it
+        """
+        if self._owns_journal:
+            return
+        self._owns_journal = True
+        if self._journal_restored:
+            print(f"✓ Restored {self._journal_restored} unsaved records from {os.path.basename(self.journal_file)}")
+            self._journal_restored = 0
+    
+    def _close_journal(self):
+        """Stop the flusher thread, write anything still queued and close the journal"""
+        if self._flusher is not None:
+            self._flusher_stop.set()
+            self._flusher.join()
+            self._flusher = None
+        self._write_journal()
+        with self._journal_lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+    
+    def _replay_journal(self):
+        """
+        Merge journaled entries missing from the loaded data into their runs
+        Returns the number of entries restored
+        """
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            print(f"Warning: Could not read entry journal: {e}")
+            return 0
+        
+        runs = {}
+        restored = 0
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Torn last line from a crash mid-write
+                continue
+            key = (record.get('laptop_id'), record.get('run_id'))
+            if key not in runs:
+                laptop = self.data['laptops'].get(key[0])
+                run = None
+                if laptop:
+                    run = next((r for r in laptop['test_runs'] if r['run_id'] == key[1]), None)
+                seen = set()
+                if run:
+                    entries = run['entries']
+                    seen.update(('entry', ts, elapsed) for ts, elapsed
+                                in zip(entries['timestamp'], entries['elapsed_seconds']))
+                    for kind in ('power_events', 'low_battery_events'):
+                        seen.update((kind, e['timestamp'], e['event']) for e in run.get(kind, ()))
+                runs[key] = (run, seen)
+            run, seen = runs[key]
+            if run is None:
+                continue
+            entry = record.get('entry')
+            if entry:
+                entry_key = ('entry', entry['timestamp'], entry['elapsed_seconds'])
+                if entry_key in seen:
+                    continue
+                _append_entry(run['entries'], entry)
+                run['total_runtime_seconds'] = entry['elapsed_seconds']
+                seen.add(entry_key)
+                restored += 1
+                continue
+            for kind in ('power_events', 'low_battery_events'):
+                event = record.get(kind)
+                if event:
+                    event_key = (kind, event['timestamp'], event['event'])
+                    if event_key not in seen:
+                        run.setdefault(kind, []).append(event)
+                        seen.add(event_key)
+                        restored += 1
+                    break
+        
+        return restored
+    
+    def write_checkpoint(self, checkpoint):
+        """
+        Atomically write a small resume checkpoint (run_id, elapsed, last percent...)
+        It is fsynced before the rename, so a crash or kill leaves either the
+        previous checkpoint or the new one, never a truncated file
+        """
+        try:
+            _atomic_write(self.checkpoint_file, json.dumps(checkpoint).encode('utf-8'),
+                          sync_dir=self.durable_dir)
+            return True
+        except Exception as e:
+            print(f"Warning: Could not write checkpoint: {e}")
+            return False
+    
+    def load_checkpoint(self):
+        """Return the last checkpoint dict, or None if there is none"""
+        try:
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def clear_checkpoint(self):
+        """Remove the checkpoint once its run is finished"""
+        try:
+            os.remove(self.checkpoint_file)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Warning: Could not remove checkpoint: {e}")
     
     def initialize_laptop(self, laptop_id, hardware_info, battery_info):
         """Initialize laptop entry in data structure"""
@@ -73,11 +410,12 @@ class DataLogger:
     
     def create_test_run(self, laptop_id, test_metadata, battery_info):
         """Create a new test run"""
-        run_id = f"run_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
+        now = datetime.now()
+        run_id = f"run_{now.strftime('%Y-%m-%d_%H-%M-%S')}"
         
         test_run = {
             'run_id': run_id,
-            'test_start_time': datetime.now().isoformat(),
+            'test_start_time': now.isoformat(timespec='milliseconds'),
             'test_end_time': None,
             'status': 'in_progress',
             'total_runtime_seconds': 0,
@@ -86,19 +424,25 @@ class DataLogger:
             'test_metadata': test_metadata,
             'power_events': [],
             'low_battery_events': [],
-            'entries': []
+            'entries': _new_entries()
         }
         
         if laptop_id not in self.data['laptops']:
             raise ValueError(f"Laptop {laptop_id} not initialized")
         
+        self._claim_journal()
         self.data['laptops'][laptop_id]['test_runs'].append(test_run)
+        self._current_run_by_laptop[laptop_id] = test_run
         self._save_data()
         
         return run_id
     
     def get_current_test_run(self, laptop_id):
         """Get the current (in-progress) test run"""
+        test_run = self._current_run_by_laptop.get(laptop_id)
+        if test_run is not None:
+            return test_run
+        
         if laptop_id not in self.data['laptops']:
             return None
         
@@ -109,51 +453,70 @@ class DataLogger:
         # Get the last test run
         last_run = test_runs[-1]
         if last_run['status'] == 'in_progress':
+            self._current_run_by_laptop[laptop_id] = last_run
             return last_run
         
         return None
     
+    def get_latest_completed_run(self, laptop_id):
+        """Most recent run of a laptop with a COMPLETED_STATUSES status, or None"""
+        test_run = self._latest_completed_run.get(laptop_id)
+        if test_run is not None:
+            return test_run
+        
+        laptop = self.data['laptops'].get(laptop_id)
+        if not laptop:
+            return None
+        for test_run in reversed(laptop['test_runs']):
+            if test_run['status'] in COMPLETED_STATUSES:
+                self._latest_completed_run[laptop_id] = test_run
+                return test_run
+        return None
+    
     def add_entry(self, laptop_id, battery_percent, elapsed_seconds, charging=False):
         """
         Add a log entry
         Returns True if entry was added (based on triggers)
         """
-        test_run = self.get_current_test_run(laptop_id)
-        if not test_run:
-            return False
-        
         if battery_percent is None:
             return False
 
+        # Most polls log nothing, so the triggers are checked before the run
+        # lookup: time-based (every 1 minute), then percentage-based (every 10% drop)
         last_time = self._last_log_time.get(laptop_id)
-        last_pct = self._last_log_percentage.get(laptop_id)
-        should_log = False
-
-        # Time-based trigger (every 1 minute)
-        if last_time is None:
-            should_log = True
-        elif elapsed_seconds - last_time >= 60:
-            should_log = True
-
-        # Percentage-based trigger (every 10% drop)
-        if last_pct is not None and int(battery_percent / 10) < int(last_pct / 10):
-            should_log = True
-
-        if should_log:
-            entry = {
-                'timestamp': datetime.now().isoformat(),
-                'battery_percent': battery_percent,
-                'elapsed_seconds': elapsed_seconds,
-                'charging': charging,
-            }
-            test_run['entries'].append(entry)
-            test_run['total_runtime_seconds'] = elapsed_seconds
-            self._last_log_time[laptop_id] = elapsed_seconds
-            self._last_log_percentage[laptop_id] = battery_percent
-            self._save_data()
-            return True
+        if last_time is not None and elapsed_seconds - last_time < 60:
+            last_pct = self._last_log_percentage.get(laptop_id)
+            if last_pct is None or battery_percent // 10 >= last_pct // 10:
+                return False
+
+        test_run = self.get_current_test_run(laptop_id)
+        if not test_run:
+            return False
 
-        return False
+        entry = {
+            'timestamp': now_iso(),
+            'battery_percent': battery_percent,
+            'elapsed_seconds': elapsed_seconds,
+            'charging': charging,
+        }
+        _append_entry(test_run['entries'], entry)
+        test_run['total_runtime_seconds'] = elapsed_seconds
+        self._last_log_time[laptop_id] = elapsed_seconds
+        self._last_log_percentage[laptop_id] = battery_percent
+        self._append_journal(laptop_id, test_run['run_id'], entry)
+        self._unsaved_entries += 1
+        self._save_if_due(battery_percent)
+        return True
+    
+    def flush(self):
+        """
+        Write any buffered entries to disk
+        Safe to call from a signal handler: if it interrupted a save in progress,
+        that save already includes everything and is left to finish
+        """
+        if self._unsaved_entries and not self._saving:
+            return self._save_data()
+        return True
     
     def add_power_event(self, laptop_id, event_type, ac_connected, battery_percent=None):
         """Add a power event (charging detected/stopped, test started, etc.)"""
@@ -162,7 +525,7 @@ class DataLogger:
             return
         
         event = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso(),
             'event': event_type,
             'ac_connected': ac_connected,
         }
@@ -170,8 +533,8 @@ class DataLogger:
         if battery_percent is not None:
             event['battery_percent'] = battery_percent
         
-        test_run['power_events'].append(event)
-        self._save_data()
+        self._add_run_event(laptop_id, test_run, 'power_events', event)
+        self._save_if_due(battery_percent)
     
     def add_low_battery_event(self, laptop_id, battery_percent):
         """Add a low battery event"""
@@ -180,13 +543,29 @@ class DataLogger:
             return
         
         event = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso(),
             'battery_percent': battery_percent,
             'event': 'low_battery_warning'
         }
         
-        test_run['low_battery_events'].append(event)
-        self._save_data()
+        self._add_run_event(laptop_id, test_run, 'low_battery_events', event)
+        self._save_if_due(battery_percent)
+    
+    def add_power_events_bulk(self, laptop_id, events):
+        """
+        Add several queued events; they are journaled, and saved with the
+        next batched write (see flush)
+        events: dicts shaped like the ones add_power_event/add_low_battery_event
+                store; 'low_battery_warning' events go to low_battery_events
+        """
+        test_run = self.get_current_test_run(laptop_id)
+        if not test_run or not events:
+            return
+        
+        for event in events:
+            kind = 'low_battery_events' if event['event'] == 'low_battery_warning' else 'power_events'
+            self._add_run_event(laptop_id, test_run, kind, event)
+        self._save_if_due(events[-1].get('battery_percent'))
     
     def finalize_test_run(self, laptop_id, status, final_battery_percent=None):
         """Finalize a test run"""
@@ -194,15 +573,19 @@ class DataLogger:
         if not test_run:
             return
 
-        test_run['test_end_time'] = datetime.now().isoformat()
+        end_time = now_iso()
+        test_run['test_end_time'] = end_time
         test_run['status'] = status
+        self._current_run_by_laptop.pop(laptop_id, None)
+        if status in COMPLETED_STATUSES:
+            self._latest_completed_run[laptop_id] = test_run
 
         if final_battery_percent is not None:
-            last_entry = test_run['entries'][-1] if test_run['entries'] else None
-            if not last_entry or last_entry['battery_percent'] != final_battery_percent:
+            percents = test_run['entries']['battery_percent']
+            if not percents or percents[-1] != final_battery_percent:
                 elapsed = test_run['total_runtime_seconds']
-                test_run['entries'].append({
-                    'timestamp': datetime.now().isoformat(),
+                _append_entry(test_run['entries'], {
+                    'timestamp': end_time,
                     'battery_percent': final_battery_percent,
                     'elapsed_seconds': elapsed,
                     'charging': False,
@@ -211,14 +594,20 @@ class DataLogger:
                 self._last_log_time[laptop_id] = elapsed
                 self._last_log_percentage[laptop_id] = final_battery_percent
 
+        # Back up after the final save, so the backup holds the finished run
+        self._claim_journal()
+        saved = self._save_data(pretty=True)
         self.backup_manager.create_backup()
-        self._save_data()
+        if saved:
+            self.clear_checkpoint()
+        self._close_journal()
     
     def mark_test_resumed(self, laptop_id):
         """Mark test run as resumed"""
         test_run = self.get_current_test_run(laptop_id)
         if test_run:
             test_run['resumed'] = True
+            self._claim_journal()
             self._save_data()
 
 
@@ -242,7 +631,7 @@ if __name__ == '__main__':
     for i in range(5):
         logger.add_entry(laptop_id, 100 - i, i * 60, False)
     
-    print(f"Added {len(logger.get_current_test_run(laptop_id)['entries'])} entries")
+    print(f"Added {len(logger.get_current_test_run(laptop_id)['entries']['timestamp'])} entries")
     
     # Cleanup
     os.remove('test_data.json')
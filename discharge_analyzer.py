@@ -2,6 +2,7 @@
 Discharge Rate Analyzer Module
 Calculates real-time discharge rate and estimates time remaining.
 """
+from collections import deque
 
 
 class DischargeAnalyzer:
@@ -14,6 +15,7 @@ class DischargeAnalyzer:
         self._last_seconds = 0
         self._rate_per_hour = 0.0
         self._short_term_rate = 0.0
+        self._recent = deque(maxlen=6)  # (elapsed_seconds, battery_percent)
 
     def update(self, battery_percent, elapsed_seconds):
         """Feed a new data point. Returns (rate_%/hr, estimated_minutes_remaining)."""
@@ -36,11 +38,29 @@ class DischargeAnalyzer:
 
         self._last_pct = battery_percent
         self._last_seconds = elapsed_seconds
+        self._recent.append((elapsed_seconds, battery_percent))
 
         rate = self._short_term_rate or self._rate_per_hour
         mins_remaining = (battery_percent / rate) * 60 if rate > 0 else 0
         return rate, mins_remaining
 
+    def suggest_poll_interval(self, target_delta_pct=0.1, min_seconds=5, max_seconds=60, default=10):
+        """
+        Seconds to sleep so the next sample lands about target_delta_pct later,
+        based on the rate over the last few samples. Returns default until
+        there is enough history to estimate a rate.
+        """
+        if len(self._recent) < 2:
+            return default
+        t_old, p_old = self._recent[0]
+        t_new, p_new = self._recent[-1]
+        if t_new <= t_old:
+            return default
+        pct_per_sec = (p_old - p_new) / (t_new - t_old)
+        if pct_per_sec <= 0:
+            return max_seconds
+        return max(min_seconds, min(max_seconds, target_delta_pct / pct_per_sec))
+
     def get_summary(self):
         """Return summary stats for the completed test."""
         return {
@@ -2,25 +2,38 @@
 Hardware Detection Module
 Collects hardware information and generates unique laptop ID
 """
+import functools
 import logging
 import platform
+import re
 import psutil
 
+from wmi_connection import WMI_AVAILABLE, get_wmi
+
 logger = logging.getLogger(__name__)
 
-try:
-    import wmi
-    WMI_AVAILABLE = True
-except ImportError:
-    WMI_AVAILABLE = False
+# Characters dropped from laptop IDs: \w is exactly str.isalnum() plus '_',
+# so this keeps the same characters as the isalnum()/'-' filter it replaced
+_ID_STRIP_RE = re.compile(r'[^\w-]|_')
+
+if not WMI_AVAILABLE:
     logging.debug("wmi module not available. Some hardware details may be missing.")
 
 
-def get_hardware_info():
+def get_hardware_info(refresh=False):
     """
     Collect comprehensive hardware information
-    Returns dict with hardware details
+    Returns dict with hardware details (a fresh copy of the per-process cache;
+    refresh=True queries the hardware again)
     """
+    if refresh:
+        _collect_hardware_info.cache_clear()
+    return dict(_collect_hardware_info())
+
+
+@functools.lru_cache(maxsize=1)
+def _collect_hardware_info():
+    """Query the hardware once per process; it doesn't change while we run"""
     hardware = {
         'cpu': platform.processor(),
         'cpu_cores': psutil.cpu_count(logical=False),
@@ -37,22 +50,26 @@ def get_hardware_info():
     # Try to get detailed info via WMI (Windows only)
     if WMI_AVAILABLE and platform.system() == 'Windows':
         try:
-            c = wmi.WMI()
+            c = get_wmi()
+            
+            # Select only the properties read below; WMI otherwise fills in
+            # every property of each object, some of them slow to fetch
             
             # System information
-            for system in c.Win32_ComputerSystem():
+            for system in c.query("SELECT Model, Manufacturer, SerialNumber FROM Win32_ComputerSystem"):
                 hardware['system_model'] = system.Model or hardware['system_model']
                 hardware['manufacturer'] = system.Manufacturer or hardware['manufacturer']
                 hardware['system_serial'] = system.SerialNumber or hardware['system_serial']
+                break
             
             # CPU information
-            for processor in c.Win32_Processor():
+            for processor in c.query("SELECT Name FROM Win32_Processor"):
                 if processor.Name:
                     hardware['cpu'] = processor.Name.strip()
                 break
             
             # Disk information
-            for disk in c.Win32_DiskDrive():
+            for disk in c.query("SELECT Model, Size, MediaType FROM Win32_DiskDrive"):
                 if disk.MediaType == 'Fixed hard disk media' or disk.Size:
                     hardware['hdd_model'] = disk.Model or hardware['hdd_model']
                     if disk.Size:
@@ -82,7 +99,7 @@ def get_battery_info():
         return None
 
     try:
-        c = wmi.WMI()
+        c = get_wmi()
         batteries = c.Win32_Battery()
         if not batteries:
             return None
@@ -101,13 +118,15 @@ def get_battery_info():
         return None
 
 
-def generate_laptop_id():
+def generate_laptop_id(hardware=None):
     """
     Generate unique laptop ID from hardware information
     Format: LAPTOP-{SERIAL}-{MODEL}-{CPU}
     Falls back to UUID-based ID if serial unavailable
+    hardware: optional dict from get_hardware_info(), to avoid collecting it twice
     """
-    hardware = get_hardware_info()
+    if hardware is None:
+        hardware = get_hardware_info()
     
     # Try to use serial number first
     if hardware.get('system_serial') and hardware['system_serial'] != 'To be filled by O.E.M.':
@@ -118,7 +137,7 @@ def generate_laptop_id():
         
         laptop_id = f"LAPTOP-{serial}-{model}-{cpu}"
         # Clean up ID (remove special chars, limit length)
-        laptop_id = ''.join(c if c.isalnum() or c == '-' else '' for c in laptop_id)
+        laptop_id = _ID_STRIP_RE.sub('', laptop_id)
         laptop_id = laptop_id[:100]  # Limit length
         return laptop_id
     else:
@@ -2,7 +2,7 @@
 Low Battery Handler Module
 Detects and handles low battery warnings
 """
-from datetime import datetime
+from data_logger import now_iso
 
 
 class LowBatteryHandler:
@@ -13,11 +13,15 @@ class LowBatteryHandler:
         self.low_battery_events = []
         self.low_battery_warning_shown = False
     
-    def check_low_battery(self, battery_percent):
+    def check_low_battery(self, battery_percent=None, status=None):
         """
         Check if battery is at low level
+        status: optional dict from BatteryMonitor.get_battery_status(), used
+                for the percentage when battery_percent isn't given
         Returns (is_low, event_dict)
         """
+        if battery_percent is None and status is not None:
+            battery_percent = status['percentage']
         if battery_percent is None:
             return False, None
         
@@ -25,7 +29,7 @@ class LowBatteryHandler:
             self.low_battery_warning_shown = True
             
             event = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now_iso(),
                 'battery_percent': battery_percent,
                 'event': 'low_battery_warning',
             }
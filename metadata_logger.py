@@ -2,9 +2,11 @@
 Test Metadata Logger Module
 Collects and logs test environment data
 """
+import heapq
 import platform
+import time
 import psutil
-from datetime import datetime
+from data_logger import now_iso
 
 try:
     from power_manager import PowerManager
@@ -25,17 +27,27 @@ def get_os_info():
 def get_top_processes(count=5):
     """Get top CPU-consuming processes"""
     try:
+        # Prime every process's CPU counter, wait once, then read them all:
+        # one 0.1 s sample window for the whole list instead of one per process
+        procs = []
+        for proc in psutil.process_iter(['name']):
+            try:
+                proc.cpu_percent(interval=None)
+                procs.append(proc)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        time.sleep(0.1)
+        
         processes = []
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent']):
+        for proc in procs:
             try:
-                proc.info['cpu_percent'] = proc.cpu_percent(interval=0.1)
-                processes.append(proc.info)
+                processes.append((proc.cpu_percent(interval=None), proc.info['name']))
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 pass
         
-        # Sort by CPU usage and get top N
-        processes.sort(key=lambda x: x['cpu_percent'] or 0, reverse=True)
-        return [p['name'] for p in processes[:count]]
+        # Top N by CPU usage
+        top = heapq.nlargest(count, processes, key=lambda p: p[0] or 0)
+        return [name for _, name in top]
     except Exception as e:
         print(f"Warning: Could not get top processes: {e}")
         return []
@@ -69,7 +81,7 @@ def collect_test_metadata(original_power_plan=None, active_power_plan=None, scre
         orig_plan = pm.get_power_plan_name()
 
     metadata = {
-        'test_start_time': datetime.now().isoformat(),
+        'test_start_time': now_iso(),
         'os_version': f"{platform.system()} {platform.release()}",
         'os_build': platform.version().split('.')[-1] if '.' in platform.version() else platform.version(),
         'original_power_plan': orig_plan,
@@ -3,6 +3,7 @@ System Power Event Logger
 Polls Windows Event Log or WMI for system power transitions.
 """
 import platform
+import threading
 
 try:
     import wmi
@@ -10,6 +11,10 @@ try:
 except ImportError:
     WMI_AVAILABLE = False
 
+from wmi_connection import get_wmi
+
+POWER_EVENT_WQL = "SELECT * FROM Win32_PowerManagementEvent"
+
 
 class PowerEventLogger:
     """Logs system power events (sleep, resume, AC connect/disconnect)."""
@@ -20,27 +25,34 @@ class PowerEventLogger:
         self._last_ac_state = None
         if self.is_windows and WMI_AVAILABLE:
             try:
-                self._wmi = wmi.WMI()
+                # Shares the thread's cached connection with the battery queries
+                self._wmi = get_wmi()
             except Exception:
                 self._wmi = None
 
-    def poll(self):
+    def poll(self, status=None):
         """
         Poll for power events. Returns dict with event info or None.
+        status: optional dict from BatteryMonitor.get_battery_status(); when
+                given, the AC state is taken from it instead of a WMI query
         Keys: event (ac_connected, ac_disconnected, battery_change), battery_percent
         """
         if not self._wmi:
             return None
 
         try:
-            batteries = self._wmi.Win32_Battery()
-            if not batteries:
-                return None
-            bat = batteries[0]
+            if status is not None:
+                pct = status['percentage']
+                ac_connected = status['ac_connected'] or status['charging']
+            else:
+                batteries = self._wmi.Win32_Battery()
+                if not batteries:
+                    return None
+                bat = batteries[0]
 
-            pct = getattr(bat, "EstimatedChargeRemaining", None)
-            status = getattr(bat, "BatteryStatus", None)
-            ac_connected = status in (2, 6, 7) if status is not None else None
+                pct = getattr(bat, "EstimatedChargeRemaining", None)
+                bat_status = getattr(bat, "BatteryStatus", None)
+                ac_connected = bat_status in (2, 6, 7) if bat_status is not None else None
 
             if ac_connected is not None and ac_connected != self._last_ac_state:
                 self._last_ac_state = ac_connected
@@ -67,3 +79,52 @@ class PowerEventLogger:
         except Exception:
             pass
         return None
+
+
+class PowerChangeWatcher:
+    """
+    Background WMI subscription to Win32_PowerManagementEvent.
+    Sets wake_event whenever Windows reports a power change (AC plugged or
+    unplugged, battery low, resume), so a waiting loop reacts at once
+    instead of sleeping out its poll interval.
+    """
+
+    def __init__(self, wake_event, timeout_ms=1000):
+        self.wake_event = wake_event
+        self.timeout_ms = timeout_ms  # how often the thread checks for stop
+        self.is_windows = platform.system() == "Windows"
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start watching. Returns False if WMI events aren't available."""
+        if not (self.is_windows and WMI_AVAILABLE):
+            return False
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="power-watcher", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self, timeout=5):
+        """Stop the watcher thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        try:
+            # Connection is created on this thread (COM apartment rules)
+            watcher = get_wmi().watch_for(raw_wql=POWER_EVENT_WQL)
+        except Exception:
+            return
+
+        while not self._stop.is_set():
+            try:
+                watcher(timeout_ms=self.timeout_ms)
+            except wmi.x_wmi_timed_out:
+                continue
+            except Exception:
+                return
+            self.wake_event.set()
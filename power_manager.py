@@ -2,8 +2,81 @@
 Power Management Module
 Manages power settings, prevents sleep, and sets power plan
 """
+import ctypes
 import platform
+import re
 import subprocess
+import uuid
+from wmi_connection import get_wmi
+
+# "Power Scheme GUID: <guid>  (<name>)" lines of powercfg /list and /duplicatescheme
+_PLAN_LINE_RE = re.compile(r'GUID:\s*([0-9a-fA-F-]{36})\s*\(([^)]*)\)')
+
+# powercfg timeouts the fallback path sets to 0 (never)
+_NEVER_TIMEOUT_SETTINGS = (
+    'monitor-timeout-ac', 'monitor-timeout-dc',
+    'standby-timeout-ac', 'standby-timeout-dc',
+    'hibernate-timeout-ac', 'hibernate-timeout-dc',
+)
+
+# Extra subprocess.run arguments so powercfg runs without creating or
+# flashing a console window
+_SPAWN = {}
+if platform.system() == 'Windows':
+    _startupinfo = subprocess.STARTUPINFO()
+    _startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    _startupinfo.wShowWindow = 0  # SW_HIDE
+    _SPAWN = {'creationflags': subprocess.CREATE_NO_WINDOW, 'startupinfo': _startupinfo}
+
+# SetThreadExecutionState flags
+ES_CONTINUOUS = 0x80000000
+ES_SYSTEM_REQUIRED = 0x00000001
+ES_DISPLAY_REQUIRED = 0x00000002
+
+
+
+class _GUID(ctypes.Structure):
+    """Win32 GUID, as used by the powrprof.dll scheme functions"""
+    _fields_ = [
+        ('Data1', ctypes.c_uint32),
+        ('Data2', ctypes.c_uint16),
+        ('Data3', ctypes.c_uint16),
+        ('Data4', ctypes.c_uint8 * 8),
+    ]
+
+
+def _powrprof_get_active_scheme():
+    """Active power plan GUID string from PowerGetActiveScheme, or None on failure"""
+    try:
+        ptr = ctypes.c_void_p()
+        if ctypes.windll.powrprof.PowerGetActiveScheme(None, ctypes.byref(ptr)) != 0:
+            return None
+        try:
+            return str(uuid.UUID(bytes_le=ctypes.string_at(ptr.value, ctypes.sizeof(_GUID))))
+        finally:
+            ctypes.windll.kernel32.LocalFree(ptr)
+    except Exception:
+        return None
+
+
+def _powrprof_set_active_scheme(guid):
+    """Activate a power plan with PowerSetActiveScheme. Returns True on success"""
+    try:
+        scheme = _GUID.from_buffer_copy(uuid.UUID(guid).bytes_le)
+        return ctypes.windll.powrprof.PowerSetActiveScheme(None, ctypes.byref(scheme)) == 0
+    except Exception:
+        return False
+
+
+def _set_active_scheme(guid):
+    """Activate a power plan, via powrprof.dll or else powercfg /setactive"""
+    if not _powrprof_set_active_scheme(guid):
+        subprocess.run(
+            ['powercfg', '/setactive', guid],
+            capture_output=True,
+            check=True,
+            **_SPAWN
+        )
 
 
 class PowerManager:
@@ -13,22 +86,30 @@ class PowerManager:
         self.original_power_plan = None
         self.original_sleep_settings = None
         self.is_windows = platform.system() == 'Windows'
+        self._execution_state_set = False
+        self._plan_list_cache = None  # {guid: name} from powercfg /list
         
     def get_current_power_plan(self):
         """Get current active power plan GUID"""
         if not self.is_windows:
             return None
         
+        # Direct DLL call; powercfg output below is slower and localized
+        guid = _powrprof_get_active_scheme()
+        if guid:
+            return guid
+        
         try:
             result = subprocess.run(
                 ['powercfg', '/getactivescheme'],
                 capture_output=True,
                 text=True,
-                check=True
+                check=True,
+                **_SPAWN
             )
             # Parse output: "Power Scheme GUID: xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx  (Name)"
-            guid = result.stdout.split('(')[0].split(':')[1].strip()
-            return guid
+            match = _PLAN_LINE_RE.search(result.stdout)
+            return match.group(1) if match else None
         except Exception as e:
             print(f"Warning: Could not get current power plan: {e}")
             return None
@@ -45,23 +126,29 @@ class PowerManager:
             return None
         
         try:
+            for plan_guid, name in self._list_plans().items():
+                if plan_guid.lower() == guid.lower():
+                    return name
+            return guid
+        except Exception as e:
+            print(f"Warning: Could not get power plan name: {e}")
+            return guid
+    
+    def _list_plans(self, refresh=False):
+        """
+        Return {guid: name} for all power plans, from one `powercfg /list` run
+        cached on the instance (refresh=True runs it again)
+        """
+        if self._plan_list_cache is None or refresh:
             result = subprocess.run(
                 ['powercfg', '/list'],
                 capture_output=True,
                 text=True,
-                check=True
+                check=True,
+                **_SPAWN
             )
-            # Parse output to find plan name
-            for line in result.stdout.split('\n'):
-                if guid.lower() in line.lower():
-                    # Extract name from parentheses
-                    if '(' in line and ')' in line:
-                        name = line.split('(')[1].split(')')[0].strip()
-                        return name
-            return guid
-        except Exception as e:
-            print(f"Warning: Could not get power plan name: {e}")
-            return guid
+            self._plan_list_cache = dict(_PLAN_LINE_RE.findall(result.stdout))
+        return self._plan_list_cache
     
     def set_high_performance_plan(self):
         """
@@ -78,54 +165,38 @@ class PowerManager:
         
         # Find High Performance plan GUID
         try:
-            result = subprocess.run(
-                ['powercfg', '/list'],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
             # Look for High Performance plan
             high_perf_guid = None
-            for line in result.stdout.split('\n'):
-                if 'high performance' in line.lower() or 'high-performance' in line.lower():
-                    # Extract GUID (first part before spaces)
-                    parts = line.strip().split()
-                    if parts:
-                        high_perf_guid = parts[0]
-                        break
+            for plan_guid, name in self._list_plans().items():
+                if 'high performance' in name.lower() or 'high-performance' in name.lower():
+                    high_perf_guid = plan_guid
+                    break
             
             # If High Performance plan not found, try to create it
             if not high_perf_guid:
                 # Try to duplicate Balanced plan and rename it
                 try:
-                    subprocess.run(
-                        ['powercfg', '/duplicatescheme', '381b4222-f694-41f0-9685-ff5bb260df2e'],  # Balanced GUID
-                        capture_output=True,
-                        check=True
-                    )
-                    # Get the new GUID and set it
                     result = subprocess.run(
-                        ['powercfg', '/list'],
+                        ['powercfg', '/duplicatescheme', '381b4222-f694-41f0-9685-ff5bb260df2e'],  # Balanced GUID
                         capture_output=True,
                         text=True,
-                        check=True
+                        check=True,
+                        **_SPAWN
                     )
-                    # Find the newly created plan (usually the first one)
-                    for line in result.stdout.split('\n'):
-                        if line.strip().startswith('Power Scheme GUID:'):
-                            high_perf_guid = line.split(':')[1].strip().split()[0]
-                            break
+                    # duplicatescheme prints the new plan's GUID
+                    match = _PLAN_LINE_RE.search(result.stdout)
+                    if match:
+                        high_perf_guid = match.group(1)
+                    else:
+                        # Otherwise take the first plan listed
+                        high_perf_guid = next(iter(self._list_plans(refresh=True)), None)
+                    self._plan_list_cache = None  # plan list changed
                 except Exception:
                     pass
 
             # Set High Performance plan
             if high_perf_guid:
-                subprocess.run(
-                    ['powercfg', '/setactive', high_perf_guid],
-                    capture_output=True,
-                    check=True
-                )
+                _set_active_scheme(high_perf_guid)
                 print(f"✓ Power plan set to High Performance")
                 return True, original_guid, original_name
             else:
@@ -142,11 +213,7 @@ class PowerManager:
             return False
         
         try:
-            subprocess.run(
-                ['powercfg', '/setactive', self.original_power_plan],
-                capture_output=True,
-                check=True
-            )
+            _set_active_scheme(self.original_power_plan)
             print(f"✓ Power plan restored to original")
             return True
         except Exception as e:
@@ -154,46 +221,32 @@ class PowerManager:
             return False
     
     def prevent_sleep(self):
-        """Prevent system from sleeping"""
+        """
+        Prevent system from sleeping
+        Uses a single SetThreadExecutionState(ES_CONTINUOUS | ...) request, which
+        Windows honours until it is cleared (restore_sleep_settings) or the
+        calling thread exits - there is no need to re-assert it while the test
+        runs. Falls back to changing the powercfg timeouts if the call fails.
+        """
         if not self.is_windows:
             return False
         
         try:
-            # Set display to never turn off
-            subprocess.run(
-                ['powercfg', '/change', 'monitor-timeout-ac', '0'],
-                capture_output=True,
-                check=True
-            )
-            subprocess.run(
-                ['powercfg', '/change', 'monitor-timeout-dc', '0'],
-                capture_output=True,
-                check=True
-            )
-            
-            # Set sleep to never
-            subprocess.run(
-                ['powercfg', '/change', 'standby-timeout-ac', '0'],
-                capture_output=True,
-                check=True
-            )
-            subprocess.run(
-                ['powercfg', '/change', 'standby-timeout-dc', '0'],
-                capture_output=True,
-                check=True
-            )
-            
-            # Set hibernate to never
-            subprocess.run(
-                ['powercfg', '/change', 'hibernate-timeout-ac', '0'],
-                capture_output=True,
-                check=True
-            )
-            subprocess.run(
-                ['powercfg', '/change', 'hibernate-timeout-dc', '0'],
-                capture_output=True,
-                check=True
+            flags = ES_CONTINUOUS | ES_SYSTEM_REQUIRED | ES_DISPLAY_REQUIRED
+            if ctypes.windll.kernel32.SetThreadExecutionState(flags):
+                self._execution_state_set = True
+                print("✓ Sleep/hibernate prevented")
+                return True
+        except Exception as e:
+            print(f"Warning: SetThreadExecutionState failed, using powercfg: {e}")
+        
+        try:
+            # Display, sleep and hibernate timeouts to never, all in one
+            # cmd.exe process rather than one powercfg spawn per setting
+            commands = ' && '.join(
+                f'powercfg /change {setting} 0' for setting in _NEVER_TIMEOUT_SETTINGS
             )
+            subprocess.run(['cmd', '/c', commands], capture_output=True, check=True, **_SPAWN)
             
             print("✓ Sleep/hibernate prevented")
             return True
@@ -203,9 +256,14 @@ class PowerManager:
     
     def restore_sleep_settings(self):
         """Restore original sleep settings (if saved)"""
-        # Note: We don't save original settings, so this is a placeholder
-        # In a full implementation, you'd save and restore original values
-        pass
+        if self._execution_state_set:
+            try:
+                ctypes.windll.kernel32.SetThreadExecutionState(ES_CONTINUOUS)
+                self._execution_state_set = False
+            except Exception as e:
+                print(f"Warning: Could not clear execution state: {e}")
+        # Note: the powercfg fallback doesn't save the original timeouts, so
+        # those can't be restored here
     
     def get_screen_brightness(self):
         """Get current screen brightness percentage"""
@@ -213,11 +271,11 @@ class PowerManager:
             return None
 
         try:
-            import wmi
-            c = wmi.WMI(namespace='wmi')
-            brightness = c.WmiMonitorBrightness()[0].CurrentBrightness
-            return brightness
-        except (ImportError, Exception):
+            # Cached per thread, shared with later brightness reads
+            c = get_wmi('wmi')
+            if c is not None:
+                return c.WmiMonitorBrightness()[0].CurrentBrightness
+        except Exception:
             pass
 
         return None
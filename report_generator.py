@@ -3,7 +3,11 @@ Report Generator Module
 Generate JPEG reports with battery stats and hardware info
 """
 from PIL import Image, ImageDraw, ImageFont
+import functools
+import hashlib
+import json
 import os
+import platform
 from datetime import datetime
 
 try:
@@ -13,37 +17,119 @@ except ImportError:
     DataLogger = None
     ResultsViewer = None
 
+WINDOWS_FONT_PATH = "C:/Windows/Fonts/arial.ttf"
+# Huffman-optimized progressive JPEG: about half the file size of a baseline
+# encode at the same quality, for a few extra milliseconds per report
+JPEG_SAVE_OPTIONS = {'quality': 95, 'optimize': True, 'progressive': True}
+# Sidecar next to generated reports: {report path: hash of what it shows}
+REPORT_CACHE_FILE = '.report_cache.json'
+
+
+def _find_font_path():
+    """System TrueType font to draw with, or None to use Pillow's default font"""
+    if os.name == 'nt' and os.path.exists(WINDOWS_FONT_PATH):  # Windows
+        return WINDOWS_FONT_PATH
+    return None
+
+
+@functools.lru_cache(maxsize=16)
+def _load_font(path, size):
+    """
+    Load a font once per (path, size); reports reuse the same few sizes.
+    Uses Pillow's basic layout engine even when libraqm is installed: report
+    text is Latin-script and needs no complex shaping
+    """
+    if path is not None:
+        try:
+            return ImageFont.truetype(path, size, layout_engine=ImageFont.Layout.BASIC)
+        except OSError:
+            pass
+    
+    # Fallback to default font
+    return ImageFont.load_default()
+
+
+# Resolved once at import; the installed fonts don't change while we run
+_FONT_PATH = _find_font_path()
+
+
+def _coalesce_columns(points):
+    """
+    Reduce a polyline sorted by x to at most four points per pixel column:
+    where it enters and leaves the column plus its highest and lowest points
+    there, in drawing order. Long runs then draw at most a few segments per
+    column, which cover the same pixels as drawing every sample
+    """
+    out = []
+    i, n = 0, len(points)
+    while i < n:
+        x = points[i][0]
+        j = i + 1
+        while j < n and points[j][0] == x:
+            j += 1
+        column = points[i:j]
+        if len(column) <= 4:
+            out.extend(column)
+        else:
+            ys = [y for _, y in column]
+            keep = sorted({0, ys.index(min(ys)), ys.index(max(ys)), len(column) - 1})
+            out.extend(column[k] for k in keep)
+        i = j
+    return out
+
 
 class ReportGenerator:
     """Generate JPEG reports for battery tests"""
     
-    def __init__(self, data_logger):
+    def __init__(self, data_logger, scale=1.0):
+        """
+        scale: size of the report relative to 1920x1080; all layout and font
+               sizes follow it (e.g. 0.75 gives 1440x810 with ~44% fewer pixels)
+        """
         if data_logger is None:
             raise ValueError("data_logger is required")
         self.data_logger = data_logger
         if ResultsViewer is None:
             raise ImportError("ResultsViewer not available")
         self.results_viewer = ResultsViewer(data_logger)
-        self.width = 1920
-        self.height = 1080
-        self.margin = 50
+        try:
+            self.scale = float(scale)
+            if self.scale <= 0:
+                raise ValueError(scale)
+        except (TypeError, ValueError):
+            print(f"Warning: Invalid report scale {scale!r}, using 1.0")
+            self.scale = 1.0
+        self.width = self._px(1920)
+        self.height = self._px(1080)
+        self.margin = self._px(50)
         self.bg_color = (255, 255, 255)
         self.text_color = (0, 0, 0)
         self.accent_color = (0, 100, 200)
+        # (text, font, fill) -> RGBA tile of the rendered text, see _draw_label
+        self._label_cache = {}
+    
+    def _px(self, size):
+        """A layout size in pixels at the report's scale"""
+        return max(1, round(size * self.scale))
     
     def _get_font(self, size=20):
         """Get font, fallback to default if custom font not available"""
-        try:
-            # Try to use a system font
-            if os.name == 'nt':  # Windows
-                font_path = "C:/Windows/Fonts/arial.ttf"
-                if os.path.exists(font_path):
-                    return ImageFont.truetype(font_path, size)
-        except:
-            pass
-        
-        # Fallback to default font
-        return ImageFont.load_default()
+        return _load_font(_FONT_PATH, self._px(size))
+    
+    def _draw_label(self, img, xy, text, font, fill):
+        """
+        Draw text that recurs across reports (headings, table headers, axis
+        labels): it is rendered once into a transparent tile, then pasted
+        """
+        key = (text, font, fill)
+        cached = self._label_cache.get(key)
+        if cached is None:
+            left, top, right, bottom = font.getbbox(text)
+            tile = Image.new('RGBA', (max(right - left, 1), max(bottom - top, 1)), (0, 0, 0, 0))
+            ImageDraw.Draw(tile).text((-left, -top), text, fill=fill, font=font)
+            cached = self._label_cache[key] = (tile, left, top)
+        tile, left, top = cached
+        img.paste(tile, (xy[0] + left, xy[1] + top), tile)
     
     def generate_report(self, laptop_id, run_id=None, output_path=None):
         """Generate JPEG report for a laptop/test run"""
@@ -58,11 +144,7 @@ class ReportGenerator:
             test_run = next((tr for tr in test_runs if tr['run_id'] == run_id), None)
         else:
             # Use latest completed test run
-            test_run = None
-            for tr in reversed(test_runs):
-                if tr['status'] in ['completed', 'low_battery_shutdown']:
-                    test_run = tr
-                    break
+            test_run = self.data_logger.get_latest_completed_run(laptop_id)
         
         if not test_run:
             raise ValueError("No completed test run found")
@@ -82,17 +164,17 @@ class ReportGenerator:
         # Title
         title = f"Battery Test Report - {laptop_id}"
         draw.text((self.margin, y), title, fill=self.accent_color, font=font_large)
-        y += 60
+        y += self._px(60)
         
         # Test run info
         run_info = f"Test Run: {test_run['run_id']} | Status: {test_run['status']}"
         draw.text((self.margin, y), run_info, fill=self.text_color, font=font_small)
-        y += 40
+        y += self._px(40)
         
         # Hardware Information
         hw = laptop['hardware_info']
-        draw.text((self.margin, y), "Hardware Information", fill=self.accent_color, font=font_medium)
-        y += 35
+        self._draw_label(img, (self.margin, y), "Hardware Information", font_medium, self.accent_color)
+        y += self._px(35)
         
         hw_lines = [
             f"CPU: {hw.get('cpu', 'N/A')}",
@@ -102,36 +184,39 @@ class ReportGenerator:
         ]
         
         for line in hw_lines:
-            draw.text((self.margin + 20, y), line, fill=self.text_color, font=font_small)
-            y += 25
+            draw.text((self.margin + self._px(20), y), line, fill=self.text_color, font=font_small)
+            y += self._px(25)
         
-        y += 20
+        y += self._px(20)
         
         # Battery Health
         if test_run.get('battery_info'):
             bat_info = test_run['battery_info']
-            draw.text((self.margin, y), "Battery Health", fill=self.accent_color, font=font_medium)
-            y += 35
+            self._draw_label(img, (self.margin, y), "Battery Health", font_medium, self.accent_color)
+            y += self._px(35)
             
             health_lines = []
-            if bat_info.get('design_capacity_mwh'):
-                health_lines.append(f"Design Capacity: {bat_info['design_capacity_mwh']:,} mWh")
-            if bat_info.get('full_charge_capacity_mwh'):
-                health_lines.append(f"Full Charge Capacity: {bat_info['full_charge_capacity_mwh']:,} mWh")
-            if bat_info.get('health_percent'):
-                health_lines.append(f"Health: {bat_info['health_percent']:.1f}%")
+            design = bat_info.get('design_capacity_mwh')
+            full_charge = bat_info.get('full_charge_capacity_mwh')
+            health = bat_info.get('health_percent')
+            if design:
+                health_lines.append(f"Design Capacity: {design:,} mWh")
+            if full_charge:
+                health_lines.append(f"Full Charge Capacity: {full_charge:,} mWh")
+            if health:
+                health_lines.append(f"Health: {health:.1f}%")
             
             for line in health_lines:
-                draw.text((self.margin + 20, y), line, fill=self.text_color, font=font_small)
-                y += 25
+                draw.text((self.margin + self._px(20), y), line, fill=self.text_color, font=font_small)
+                y += self._px(25)
             
-            y += 20
+            y += self._px(20)
         
         # Test Statistics
         stats = self.results_viewer.get_test_statistics(test_run)
         if stats:
-            draw.text((self.margin, y), "Test Statistics", fill=self.accent_color, font=font_medium)
-            y += 35
+            self._draw_label(img, (self.margin, y), "Test Statistics", font_medium, self.accent_color)
+            y += self._px(35)
             
             stat_lines = [
                 f"Total Runtime: {stats['formatted_runtime']}",
@@ -140,28 +225,31 @@ class ReportGenerator:
             ]
             
             for line in stat_lines:
-                draw.text((self.margin + 20, y), line, fill=self.text_color, font=font_small)
-                y += 25
+                draw.text((self.margin + self._px(20), y), line, fill=self.text_color, font=font_small)
+                y += self._px(25)
             
             # Milestones
-            if stats['milestones']:
-                y += 10
-                draw.text((self.margin + 20, y), "Battery Milestones:", fill=self.text_color, font=font_small)
-                y += 25
+            milestones = stats['milestones']
+            if milestones:
+                y += self._px(10)
+                self._draw_label(img, (self.margin + self._px(20), y), "Battery Milestones:", font_small, self.text_color)
+                y += self._px(25)
                 
-                milestone_x = self.margin + 40
+                milestone_x = self.margin + self._px(40)
+                line_height = self._px(20)
                 for pct in [100, 90, 80, 70, 60, 50, 40, 30, 20, 10, 0]:
-                    if pct in stats['milestones']:
-                        milestone_text = f"{pct:3d}%: {stats['milestones'][pct]['formatted_time']}"
+                    milestone = milestones.get(pct)
+                    if milestone:
+                        milestone_text = f"{pct:3d}%: {milestone['formatted_time']}"
                         draw.text((milestone_x, y), milestone_text, fill=self.text_color, font=font_tiny)
-                        y += 20
+                        y += line_height
         
         # Test Metadata
         if test_run.get('test_metadata'):
             metadata = test_run['test_metadata']
-            y += 20
-            draw.text((self.margin, y), "Test Environment", fill=self.accent_color, font=font_medium)
-            y += 35
+            y += self._px(20)
+            self._draw_label(img, (self.margin, y), "Test Environment", font_medium, self.accent_color)
+            y += self._px(35)
             
             meta_lines = [
                 f"OS: {metadata.get('os_version', 'N/A')}",
@@ -172,14 +260,14 @@ class ReportGenerator:
                 meta_lines.append(f"Screen Brightness: {metadata['screen_brightness']}%")
             
             for line in meta_lines:
-                draw.text((self.margin + 20, y), line, fill=self.text_color, font=font_small)
-                y += 25
+                draw.text((self.margin + self._px(20), y), line, fill=self.text_color, font=font_small)
+                y += self._px(25)
         
         # Discharge Chart (simple bar chart)
-        if test_run['entries']:
-            y += 30
+        if test_run['entries']['timestamp']:
+            y += self._px(30)
             chart_y = y
-            chart_height = 200
+            chart_height = self._px(200)
             chart_width = self.width - (self.margin * 2)
             chart_x = self.margin
             
@@ -191,31 +279,39 @@ class ReportGenerator:
             )
             
             # Draw discharge curve
-            entries = test_run['entries']
-            if len(entries) > 1:
-                max_time = max(e['elapsed_seconds'] for e in entries) or 1
+            elapsed = test_run['entries']['elapsed_seconds']
+            percents = test_run['entries']['battery_percent']
+            if len(elapsed) > 1:
+                max_time = max(elapsed) or 1
                 max_percent = 100
 
+                chart_bottom = chart_y + chart_height
                 points = []
-                for entry in entries:
-                    x = chart_x + int((entry['elapsed_seconds'] / max_time) * chart_width)
-                    y_pos = chart_y + chart_height - int((entry['battery_percent'] / max_percent) * chart_height)
-                    points.append((x, y_pos))
+                last = None
+                for seconds, percent in zip(elapsed, percents):
+                    point = (chart_x + int((seconds / max_time) * chart_width),
+                             chart_bottom - int((percent / max_percent) * chart_height))
+                    # Long runs put many samples on the same pixel; draw each once
+                    if point != last:
+                        points.append(point)
+                        last = point
+                
+                points = _coalesce_columns(points)
                 
                 # Draw line
                 if len(points) > 1:
-                    draw.line(points, fill=self.accent_color, width=3)
+                    draw.line(points, fill=self.accent_color, width=self._px(3))
                 
                 # Draw axes labels
-                draw.text((chart_x, chart_y + chart_height + 10), "0%", fill=self.text_color, font=font_tiny)
-                draw.text((chart_x, chart_y - 20), "100%", fill=self.text_color, font=font_tiny)
-                draw.text((chart_x + chart_width - 50, chart_y + chart_height + 10), 
+                self._draw_label(img, (chart_x, chart_y + chart_height + self._px(10)), "0%", font_tiny, self.text_color)
+                self._draw_label(img, (chart_x, chart_y - self._px(20)), "100%", font_tiny, self.text_color)
+                draw.text((chart_x + chart_width - self._px(50), chart_y + chart_height + self._px(10)), 
                          self.results_viewer.format_time(max_time), fill=self.text_color, font=font_tiny)
             
-            y += chart_height + 40
+            y += chart_height + self._px(40)
         
         # Footer
-        footer_y = self.height - 50
+        footer_y = self.height - self._px(50)
         footer_text = f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
         draw.text((self.margin, footer_y), footer_text, fill=(128, 128, 128), font=font_tiny)
         
@@ -226,7 +322,7 @@ class ReportGenerator:
             else:
                 output_path = f"battery_test_report_{laptop_id}.jpg"
         
-        img.save(output_path, 'JPEG', quality=95)
+        img.save(output_path, 'JPEG', **JPEG_SAVE_OPTIONS)
         return output_path
     
     def generate_report_and_open(self, laptop_id, run_id=None, output_path=None, auto_open=True):
@@ -238,7 +334,6 @@ class ReportGenerator:
 
     def _open_report(self, report_path):
         """Open a generated report file with the OS default viewer."""
-        import platform
         try:
             if platform.system() == 'Windows':
                 os.startfile(report_path)
@@ -256,22 +351,6 @@ class ReportGenerator:
         if not laptops:
             raise ValueError("No laptops found")
         
-        # Create image
-        img = Image.new('RGB', (self.width, self.height), self.bg_color)
-        draw = ImageDraw.Draw(img)
-        
-        # Fonts
-        font_large = self._get_font(36)
-        font_medium = self._get_font(24)
-        font_small = self._get_font(18)
-        
-        y = self.margin
-        
-        # Title
-        title = "Battery Test Comparison Report"
-        draw.text((self.margin, y), title, fill=self.accent_color, font=font_large)
-        y += 60
-        
         # Collect data for all laptops
         laptop_data = []
         for laptop_id, laptop in laptops.items():
@@ -280,11 +359,7 @@ class ReportGenerator:
                 continue
             
             # Get latest completed test run
-            latest_run = None
-            for test_run in reversed(test_runs):
-                if test_run['status'] in ['completed', 'low_battery_shutdown']:
-                    latest_run = test_run
-                    break
+            latest_run = self.data_logger.get_latest_completed_run(laptop_id)
             
             if latest_run:
                 stats = self.results_viewer.get_test_statistics(latest_run)
@@ -295,50 +370,104 @@ class ReportGenerator:
                         'stats': stats,
                     })
         
+        if output_path is None:
+            output_path = "battery_test_comparison.jpg"
+        
+        # Nothing to redraw or re-encode if the report on disk shows the same rows
+        rows = [(item['laptop_id'][:25], item['stats']['formatted_runtime'],
+                 f"{item['stats']['discharge_rate']:.2f}%/hr", item['stats']['status'])
+                for item in laptop_data[:10]]  # Limit to 10 laptops
+        digest = hashlib.blake2b(json.dumps([
+            rows, self.width, self.height, self.margin, self.bg_color,
+            self.text_color, self.accent_color, _FONT_PATH,
+        ]).encode('utf-8')).hexdigest()
+        if self._cached_report_matches(output_path, digest):
+            # Its "Generated:" footer keeps the time the results last changed
+            print(f"Comparison results unchanged, reusing {output_path}")
+            return output_path
+        
+        # Create image
+        img = Image.new('RGB', (self.width, self.height), self.bg_color)
+        draw = ImageDraw.Draw(img)
+        
+        # Fonts
+        font_large = self._get_font(36)
+        font_medium = self._get_font(24)
+        font_small = self._get_font(18)
+        
+        y = self.margin
+        
+        # Title
+        title = "Battery Test Comparison Report"
+        self._draw_label(img, (self.margin, y), title, font_large, self.accent_color)
+        y += self._px(60)
+        
         # Display comparison table
-        table_y = y + 20
-        draw.text((self.margin, y), "Laptop Comparison", fill=self.accent_color, font=font_medium)
-        y = table_y + 40
+        table_y = y + self._px(20)
+        self._draw_label(img, (self.margin, y), "Laptop Comparison", font_medium, self.accent_color)
+        y = table_y + self._px(40)
         
         # Table header
         headers = ["Laptop ID", "Runtime", "Discharge Rate", "Status"]
-        col_widths = [300, 150, 150, 150]
+        col_widths = [self._px(w) for w in (300, 150, 150, 150)]
         x = self.margin
         
         for i, header in enumerate(headers):
-            draw.text((x, y), header, fill=self.accent_color, font=font_small)
+            self._draw_label(img, (x, y), header, font_small, self.accent_color)
             x += col_widths[i]
         
-        y += 30
+        y += self._px(30)
         
         # Table rows
-        for item in laptop_data[:10]:  # Limit to 10 laptops
+        for laptop_text, runtime_text, discharge_text, status in rows:
             x = self.margin
-            draw.text((x, y), item['laptop_id'][:25], fill=self.text_color, font=font_small)
+            draw.text((x, y), laptop_text, fill=self.text_color, font=font_small)
             x += col_widths[0]
             
-            draw.text((x, y), item['stats']['formatted_runtime'], fill=self.text_color, font=font_small)
+            draw.text((x, y), runtime_text, fill=self.text_color, font=font_small)
             x += col_widths[1]
             
-            discharge_text = f"{item['stats']['discharge_rate']:.2f}%/hr"
             draw.text((x, y), discharge_text, fill=self.text_color, font=font_small)
             x += col_widths[2]
             
-            draw.text((x, y), item['stats']['status'], fill=self.text_color, font=font_small)
+            self._draw_label(img, (x, y), status, font_small, self.text_color)
             
-            y += 30
+            y += self._px(30)
         
         # Footer
-        footer_y = self.height - 50
+        footer_y = self.height - self._px(50)
         footer_text = f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
         draw.text((self.margin, footer_y), footer_text, fill=(128, 128, 128), font=self._get_font(14))
         
-        # Save image
-        if output_path is None:
-            output_path = "battery_test_comparison.jpg"
-        
-        img.save(output_path, 'JPEG', quality=95)
+        img.save(output_path, 'JPEG', **JPEG_SAVE_OPTIONS)
+        self._remember_report(output_path, digest)
         return output_path
+    
+    def _report_cache_path(self, output_path):
+        return os.path.join(os.path.dirname(os.path.abspath(output_path)), REPORT_CACHE_FILE)
+    
+    def _load_report_cache(self, output_path):
+        try:
+            with open(self._report_cache_path(output_path), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _cached_report_matches(self, output_path, digest):
+        """True if output_path exists and was generated from inputs hashing to digest"""
+        if not os.path.exists(output_path):
+            return False
+        return self._load_report_cache(output_path).get(os.path.abspath(output_path)) == digest
+    
+    def _remember_report(self, output_path, digest):
+        """Record the input hash of a freshly written report"""
+        cache = self._load_report_cache(output_path)
+        cache[os.path.abspath(output_path)] = digest
+        try:
+            with open(self._report_cache_path(output_path), 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+        except OSError as e:
+            print(f"Warning: Could not update report cache: {e}")
 
 
 if __name__ == '__main__':
@@ -2,6 +2,7 @@
 Results Viewer Module
 Display test results with sorting and comparison
 """
+import functools
 from datetime import datetime
 
 BATTERY_MILESTONES = [100, 90, 80, 70, 60, 50, 40, 30, 20, 10, 0]
@@ -12,6 +13,14 @@ except ImportError:
     DataLogger = None
 
 
+@functools.lru_cache(maxsize=1024)
+def _format_hms(total_seconds):
+    """HH:MM:SS for a whole number of seconds (cached: views re-format the same entries)"""
+    hours, rem = divmod(total_seconds, 3600)
+    minutes, secs = divmod(rem, 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+
 class ResultsViewer:
     """Display battery test results"""
     
@@ -19,47 +28,63 @@ class ResultsViewer:
         if data_logger is None:
             raise ValueError("data_logger is required")
         self.data_logger = data_logger
+        # run_id -> (test_run, state key, stats) from get_test_statistics
+        self._stats_cache = {}
     
     def format_time(self, seconds):
         """Format seconds as HH:MM:SS"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+        return _format_hms(int(seconds // 1))
     
     def get_test_statistics(self, test_run):
-        """Calculate statistics for a test run"""
-        if not test_run['entries']:
+        """
+        Calculate statistics for a test run
+        Results are cached per run until it gains entries or changes status
+        """
+        key = (len(test_run['entries']['timestamp']), test_run['total_runtime_seconds'], test_run['status'])
+        cached = self._stats_cache.get(test_run['run_id'])
+        if cached is not None and cached[0] is test_run and cached[1] == key:
+            return cached[2]
+        stats = self._compute_test_statistics(test_run)
+        self._stats_cache[test_run['run_id']] = (test_run, key, stats)
+        return stats
+    
+    def _compute_test_statistics(self, test_run):
+        entries = test_run['entries']
+        if not entries['timestamp']:
             return None
         
-        entries = test_run['entries']
+        percents = entries['battery_percent']
+        elapsed = entries['elapsed_seconds']
         total_runtime = test_run['total_runtime_seconds']
         
         # Calculate discharge rate (% per hour)
         if total_runtime > 0:
-            first_percent = entries[0]['battery_percent']
-            last_percent = entries[-1]['battery_percent']
+            first_percent = percents[0]
+            last_percent = percents[-1]
             discharge_rate = ((first_percent - last_percent) / total_runtime) * 3600
         else:
             discharge_rate = 0
         
-        # Find percentage milestones
+        # Find percentage milestones: the first entry at or below each target.
+        # Targets run high to low, so one pass over the entries finds them all
         milestones = {}
-        for target in BATTERY_MILESTONES:
-            for entry in entries:
-                if entry['battery_percent'] <= target:
-                    milestones[target] = {
-                        'time': entry['elapsed_seconds'],
-                        'formatted_time': self.format_time(entry['elapsed_seconds'])
-                    }
-                    break
+        ti = 0
+        for percent, seconds in zip(percents, elapsed):
+            while ti < len(BATTERY_MILESTONES) and percent <= BATTERY_MILESTONES[ti]:
+                milestones[BATTERY_MILESTONES[ti]] = {
+                    'time': seconds,
+                    'formatted_time': self.format_time(seconds)
+                }
+                ti += 1
+            if ti == len(BATTERY_MILESTONES):
+                break
         
         return {
             'total_runtime': total_runtime,
             'formatted_runtime': self.format_time(total_runtime),
             'discharge_rate': discharge_rate,
             'milestones': milestones,
-            'entries_count': len(entries),
+            'entries_count': len(percents),
             'status': test_run['status'],
         }
     
@@ -117,8 +142,8 @@ class ResultsViewer:
             # Milestones
             if stats['milestones']:
                 print("\n  Battery Milestones:")
-                for pct in sorted(stats['milestones'], reverse=True):
-                    print(f"    {pct:3d}%: {stats['milestones'][pct]['formatted_time']}")
+                for pct, milestone in sorted(stats['milestones'].items(), reverse=True):
+                    print(f"    {pct:3d}%: {milestone['formatted_time']}")
     
     def display_comparison(self, sort_by='runtime'):
         """Display comparison of all laptops"""
@@ -141,11 +166,7 @@ class ResultsViewer:
                 continue
             
             # Get latest completed test run
-            latest_run = None
-            for test_run in reversed(test_runs):
-                if test_run['status'] in ['completed', 'low_battery_shutdown']:
-                    latest_run = test_run
-                    break
+            latest_run = self.data_logger.get_latest_completed_run(laptop_id)
             
             if latest_run:
                 stats = self.get_test_statistics(latest_run)
@@ -221,8 +242,9 @@ class ResultsViewer:
         if not run:
             run = test_runs[-1]
 
-        entries = run.get('entries', [])
-        if not entries:
+        entries = run.get('entries') or {}
+        count = len(entries.get('timestamp', ()))
+        if not count:
             print("No log entries in this test run.")
             return None
 
@@ -234,18 +256,20 @@ class ResultsViewer:
             writer = csv.writer(f)
             writer.writerow(['timestamp', 'battery_percent', 'elapsed_seconds',
                              'elapsed_hours', 'charging', 'run_id', 'laptop_id'])
-            for entry in entries:
+            rows = zip(entries['timestamp'], entries['battery_percent'],
+                       entries['elapsed_seconds'], entries['charging'])
+            for timestamp, percent, seconds, charging in rows:
                 writer.writerow([
-                    entry.get('timestamp', ''),
-                    entry.get('battery_percent', ''),
-                    entry.get('elapsed_seconds', ''),
-                    round(entry.get('elapsed_seconds', 0) / 3600, 4),
-                    entry.get('charging', False),
+                    timestamp or '',
+                    '' if percent is None else percent,
+                    '' if seconds is None else seconds,
+                    round((seconds or 0) / 3600, 4),
+                    charging or False,
                     run.get('run_id', ''),
                     laptop_id,
                 ])
 
-        print(f"✓ CSV exported to: {output_path} ({len(entries)} entries)")
+        print(f"✓ CSV exported to: {output_path} ({count} entries)")
         return output_path
 
 
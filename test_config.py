@@ -11,7 +11,9 @@ DEFAULTS = {
     "default_power_plan": "high_performance",
     "sort_order": "runtime",
     "auto_open_report": False,
+    "report_scale": 1.0,
     "log_interval_seconds": 10,
+    "poll_target_delta": 0.1,
     "preset": "full_discharge",
     "csv_export": False,
     "brightness_percent": 100,
@@ -57,6 +59,20 @@ class TestConfig:
         self.save()
         return True
 
+    def update(self, values):
+        """Set several keys with one save; skips the write if nothing changed"""
+        changed = False
+        for key, value in values.items():
+            if key not in DEFAULTS:
+                print(f"Warning: Unknown config key '{key}'. Available: {', '.join(DEFAULTS.keys())}")
+                continue
+            if self.data.get(key) != value:
+                self.data[key] = value
+                changed = True
+        if changed:
+            self.save()
+        return changed
+
     def show(self):
         print("\nConfiguration:")
         for k, v in self.data.items():
@@ -28,11 +28,11 @@ class TestResumer:
         print("INCOMPLETE TEST FOUND")
         print("=" * 50)
         print(f"Test started: {test_run['test_start_time']}")
-        print(f"Last entry: {len(test_run['entries'])} entries")
-        if test_run['entries']:
-            last_entry = test_run['entries'][-1]
-            print(f"Last battery: {last_entry['battery_percent']:.1f}%")
-            print(f"Runtime: {last_entry['elapsed_seconds'] / 60:.1f} minutes")
+        entries = test_run['entries']
+        print(f"Last entry: {len(entries['timestamp'])} entries")
+        if entries['timestamp']:
+            print(f"Last battery: {entries['battery_percent'][-1]:.1f}%")
+            print(f"Runtime: {entries['elapsed_seconds'][-1] / 60:.1f} minutes")
         
         print("\nOptions:")
         print("  1. Resume test")
@@ -47,13 +47,25 @@ class TestResumer:
             else:
                 print("Invalid choice. Please enter 1 or 2.")
     
-    def resume_test(self, laptop_id):
-        """Resume an interrupted test"""
+    def resume_test(self, laptop_id, config_hash=None):
+        """
+        Resume an interrupted test
+        config_hash: hash of the current test settings; a warning is printed if
+                     the run's checkpoint was written with different settings
+        """
         test_run = self.find_incomplete_test(laptop_id)
         
         if not test_run:
             return None
         
+        checkpoint = self.data_logger.load_checkpoint()
+        if checkpoint and (checkpoint.get('run_id') != test_run['run_id']
+                           or checkpoint.get('laptop_id') != laptop_id):
+            checkpoint = None
+        if checkpoint and config_hash and checkpoint.get('config_hash') != config_hash:
+            print("Warning: Test settings changed since this run started; "
+                  "resumed results may not be comparable.")
+        
         # Mark as resumed
         self.data_logger.mark_test_resumed(laptop_id)
         
@@ -63,13 +75,24 @@ class TestResumer:
         except (ValueError, TypeError):
             start_time = datetime.now()
 
+        # The checkpoint is written more often than entries reach the data
+        # file, so prefer it when it is further along
+        entries = test_run['entries']
+        has_entries = bool(entries['timestamp'])
+        if checkpoint and (not has_entries or checkpoint.get('elapsed', 0) > entries['elapsed_seconds'][-1]):
+            return {
+                'start_time': start_time,
+                'last_battery_percent': checkpoint.get('last_percent', 100),
+                'last_elapsed_seconds': checkpoint.get('elapsed', 0),
+                'run_id': test_run['run_id'],
+            }
+
         # Get last entry info
-        if test_run['entries']:
-            last_entry = test_run['entries'][-1]
+        if has_entries:
             return {
                 'start_time': start_time,
-                'last_battery_percent': last_entry['battery_percent'],
-                'last_elapsed_seconds': last_entry['elapsed_seconds'],
+                'last_battery_percent': entries['battery_percent'][-1],
+                'last_elapsed_seconds': entries['elapsed_seconds'][-1],
                 'run_id': test_run['run_id'],
             }
 
@@ -100,6 +123,6 @@ if __name__ == '__main__':
     if incomplete:
         print("Incomplete test found:")
         print(f"  Run ID: {incomplete['run_id']}")
-        print(f"  Entries: {len(incomplete['entries'])}")
+        print(f"  Entries: {len(incomplete['entries']['timestamp'])}")
     else:
         print("No incomplete test found")
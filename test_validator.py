@@ -24,9 +24,10 @@ class TestValidator:
         self.errors = []
         self.warnings = []
     
-    def validate_battery_charge(self, threshold=100):
+    def validate_battery_charge(self, threshold=100, status=None):
         """Verify battery is at specified charge level"""
-        status = self.battery_monitor.get_battery_status()
+        if status is None:
+            status = self.battery_monitor.get_battery_status()
         
         if status['percentage'] is None:
             self.errors.append("Battery not detected by system")
@@ -40,9 +41,10 @@ class TestValidator:
         
         return True
     
-    def validate_ac_disconnected(self):
+    def validate_ac_disconnected(self, status=None):
         """Verify AC power is disconnected"""
-        status = self.battery_monitor.get_battery_status()
+        if status is None:
+            status = self.battery_monitor.get_battery_status()
         
         if status['ac_connected'] or status['charging']:
             self.errors.append("AC power is still connected. Please disconnect charger.")
@@ -72,9 +74,10 @@ class TestValidator:
         
         return True
     
-    def validate_battery_detected(self):
+    def validate_battery_detected(self, status=None):
         """Verify battery is detected by system"""
-        status = self.battery_monitor.get_battery_status()
+        if status is None:
+            status = self.battery_monitor.get_battery_status()
         
         if status['percentage'] is None:
             self.errors.append("Battery not detected by system")
@@ -103,17 +106,20 @@ class TestValidator:
         self.errors = []
         self.warnings = []
         
+        # One status read shared by the battery checks below
+        status = self.battery_monitor.get_battery_status()
+        
         # Check battery detected
-        if not self.validate_battery_detected():
+        if not self.validate_battery_detected(status):
             return False, self.errors, self.warnings
         
         # Check battery charge
         if require_100_percent:
-            if not self.validate_battery_charge(100):
+            if not self.validate_battery_charge(100, status):
                 return False, self.errors, self.warnings
         
         # Check AC disconnected
-        if not self.validate_ac_disconnected():
+        if not self.validate_ac_disconnected(status):
             return False, self.errors, self.warnings
         
         # Check battery health (warning only)
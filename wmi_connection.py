@@ -0,0 +1,50 @@
+"""
+WMI Connection Module
+Caches wmi.WMI() connections so repeated queries skip COM/namespace setup
+"""
+import platform
+import threading
+
+try:
+    import wmi
+    WMI_AVAILABLE = True
+except ImportError:
+    WMI_AVAILABLE = False
+
+try:
+    import pythoncom
+except ImportError:
+    pythoncom = None
+
+# COM objects belong to the apartment (thread) that created them, so each
+# thread keeps its own {namespace: connection} cache
+_local = threading.local()
+
+
+def get_wmi(namespace=None):
+    """
+    Get a cached wmi.WMI() connection for the calling thread
+    Returns None if WMI is not available on this system
+    """
+    if not WMI_AVAILABLE or platform.system() != 'Windows':
+        return None
+
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+        # The main thread is initialized by pythoncom on import; others are not
+        if pythoncom is not None and threading.current_thread() is not threading.main_thread():
+            pythoncom.CoInitialize()
+
+    conn = connections.get(namespace)
+    if conn is None:
+        conn = wmi.WMI(namespace=namespace) if namespace else wmi.WMI()
+        connections[namespace] = conn
+    return conn
+
+
+def reset_wmi(namespace=None):
+    """Drop the calling thread's cached connection so the next call reconnects"""
+    connections = getattr(_local, 'connections', None)
+    if connections:
+        connections.pop(namespace, None)